@@ -1 +1 @@
-from jungle.utils.jungleprofiler import JungleExperiment, JungleProfiler
\ No newline at end of file
+from jungle.utils.jungleprofiler import JungleExperiment, JungleProfiler, ExperimentResult, ProfileResult
\ No newline at end of file
@@ -0,0 +1,4 @@
+import sys
+from jungle.cli import main
+
+sys.exit(main())
@@ -0,0 +1,146 @@
+'''
+Command line runner for the test tree, usable as a performance gate
+    python -m jungle [--root DIR] [--workers N] [--update-baseline]
+Runs TestTreeAutomation headlessly, then compares the walltime samples of every
+(prototype, test, implementation, kwarg cell) with those stored in the baseline file. Exits with 1 and prints a table
+of the offending cells when any cell is significantly slower (one sided Mann-Whitney U over reps, p values adjusted
+across cells with --correction) by more than the threshold, 0 otherwise. Cells with fewer than --min-samples samples
+on either side are reported as untestable, failing the gate only with --fail-untestable
+'''
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from jungle.utils.analysis import mann_whitney_greater, adjust_pvalues
+
+
+def cell_samples(file_dict):
+    '''
+    Timing samples of every kwarg cell of every result in a TestTreeAutomation file dict
+    :return: dict of 'module::prototype::test::implementation::kwarg=val,...' -> {'metric', 'samples'}
+    '''
+    cells = {}
+    for module, prototype_dicts in file_dict.items():
+        for prototype, test_dicts in prototype_dicts.items():
+            for test, methods_dict in test_dicts.items():
+                for method, result in methods_dict.items():
+                    df = result.controller_df
+                    metric = 'walltime' if 'walltime' in df and df['walltime'].notna().any() else 'controller walltime'
+                    kwarg_cols = sorted(col for col in df.columns if col.startswith('kwarg: '))
+                    groups = df.groupby(kwarg_cols, sort=True) if kwarg_cols else [((), df)]
+                    for levels, cell_df in groups:
+                        levels = levels if isinstance(levels, tuple) else (levels,)
+                        cell = ','.join('%s=%s' % (col.replace('kwarg: ', ''), level)
+                                        for col, level in zip(kwarg_cols, levels))
+                        key = '::'.join((module, prototype, test, method, cell))
+                        cells[key] = {'metric': metric, 'samples': cell_df[metric].dropna().tolist()}
+    return cells
+
+
+def compare_cells(baseline, current, alpha=0.05, threshold=0.1, min_samples=8, correction='holm'):
+    '''
+    Compare the current samples of every cell with its baseline ones
+    A cell regresses when its samples are significantly larger at alpha, once p values are adjusted for the number of
+    cells tested, and its median is more than threshold (relative) above the baseline median
+    :param min_samples: samples needed on each side to test a cell. The smallest exact p value of n against n samples
+        is 1 / C(2n, n): 0.05 for 3, 0.004 for 5 and 0.00008 for 8, which still passes a Holm correction across about
+        600 cells at alpha 0.05
+    :param correction: 'holm', 'bh' or None, see adjust_pvalues
+    :return: list of (key, baseline median, current median, relative change, adjusted p value, regressed), cells
+    missing from the baseline are left out. Cells with fewer than min_samples samples on either side have a NaN p value
+    and regressed None
+    '''
+    rows = []
+    for key, cell in sorted(current.items()):
+        if key not in baseline or baseline[key]['metric'] != cell['metric']:
+            continue
+        base_samples, samples = baseline[key]['samples'], cell['samples']
+        if not base_samples or not samples:
+            continue
+        base_median, median = np.median(base_samples), np.median(samples)
+        change = median / base_median - 1
+        if min(len(base_samples), len(samples)) < min_samples:
+            rows.append((key, base_median, median, change, np.nan, None))
+            continue
+        _, p = mann_whitney_greater(samples, base_samples)
+        rows.append((key, base_median, median, change, p, False))
+
+    tested = [i for i, row in enumerate(rows) if row[-1] is not None]
+    p_values = [rows[i][4] for i in tested]
+    if correction is not None:
+        p_values = adjust_pvalues(p_values, correction)
+    for i, p in zip(tested, p_values):
+        key, base_median, median, change, _, _ = rows[i]
+        rows[i] = (key, base_median, median, change, p, bool(p < alpha and change > threshold))
+    return rows
+
+
+def print_table(rows):
+    print('%-70s %12s %12s %8s %8s' % ('cell', 'baseline', 'current', 'change', 'p'))
+    for key, base_median, median, change, p, regressed in rows:
+        print('%-70s %12.6g %12.6g %+7.1f%% %8.4f%s' % (key, base_median, median, 100 * change, p,
+                                                       {True: '  REGRESSED', None: '  UNTESTABLE'}.get(regressed, '')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='jungle', description='Run the test tree and gate on performance regressions')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='directory holding the code directory, results are written here too')
+    parser.add_argument('--baseline', default='perf_baseline.json', help='baseline file, relative to root')
+    parser.add_argument('--update-baseline', action='store_true', help='store this run as the baseline and exit 0')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes to run tests in')
+    parser.add_argument('--dev', action='store_true', help='rerun every test, ignoring cached results')
+    parser.add_argument('--reports', action='store_true', help='render the report figures too')
+    parser.add_argument('--alpha', type=float, default=0.05, help='significance level of the Mann-Whitney test')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase of the median a significant slowdown must exceed to fail')
+    parser.add_argument('--min-samples', type=int, default=8, help='samples a cell needs on each side to be tested')
+    parser.add_argument('--correction', choices=('holm', 'bh', 'none'), default='holm',
+                        help='adjustment of the p values for testing every cell: Holm, Benjamini-Hochberg or none')
+    parser.add_argument('--fail-untestable', action='store_true',
+                        help='fail when a cell has too few samples to be tested, instead of only reporting it')
+    args = parser.parse_args(argv)
+
+    # The code directory is imported as the 'code' package from root, which the stdlib's code module shadows when a
+    # dependency already imported it
+    os.chdir(args.root)
+    sys.path.insert(0, os.getcwd())
+    if not hasattr(sys.modules.get('code'), '__path__'):
+        sys.modules.pop('code', None)
+    from jungle.test_tree import TestTreeAutomation
+
+    tree = TestTreeAutomation(dev=args.dev, workers=args.workers, reports=args.reports)
+    current = cell_samples(tree.file_dict)
+
+    if args.update_baseline:
+        with open(args.baseline, mode='w') as out_file:
+            json.dump(current, out_file, sort_keys=True, indent=3)
+        print('Stored the baseline of %d cells in %s' % (len(current), os.path.abspath(args.baseline)))
+        return 0
+
+    try:
+        with open(args.baseline, mode='r') as in_file:
+            baseline = json.load(in_file)
+    except FileNotFoundError:
+        print('No baseline at %s, run with --update-baseline to create one' % os.path.abspath(args.baseline))
+        return 0
+
+    rows = compare_cells(baseline, current, alpha=args.alpha, threshold=args.threshold, min_samples=args.min_samples,
+                         correction=None if args.correction == 'none' else args.correction)
+    new_cells = [key for key in current if key not in baseline]
+    if new_cells:
+        print('%d cells have no baseline: %s' % (len(new_cells), ', '.join(sorted(new_cells))))
+    regressions = [row for row in rows if row[-1]]
+    untestable = [row for row in rows if row[-1] is None]
+    print('\n%d of %d cells regressed, %d untestable with fewer than %d samples'
+          % (len(regressions), len(rows) - len(untestable), len(untestable), args.min_samples))
+    if untestable:
+        print_table(untestable)
+    if regressions:
+        print_table(regressions)
+    return 1 if regressions or (untestable and args.fail_untestable) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
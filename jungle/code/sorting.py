@@ -3,21 +3,38 @@ Sorting Examples for showcasing and developing Jungle features
 '''
 import inspect
 from jungle import JungleExperiment, JungleProfiler
+from jungle.utils.workloads import workload, count_runs
 import numpy as np
 
 print('Finished Loading Modules')
 
+
+def random_list(n, seed):
+    ''' List of n normally distributed floats '''
+    np.random.seed(seed)
+    return list(np.random.randn(n))
+
+
+def block_array(n_blocks, block_size, seed):
+    ''' n_blocks sorted blocks of block_size values, in random order '''
+    a = workload(n_blocks * block_size, presortedness=1., n_blocks=n_blocks, seed=seed)
+    if count_runs(a) != n_blocks:
+        raise ValueError('block_array built %d runs instead of n_blocks: %d' % (count_runs(a), n_blocks))
+    return a
+
+
+def is_sorted(a):
+    return bool(np.all(a[:-1] <= a[1:]))
+
+
 class Sorting_Prototype:
 
     print('\n---Test Sort N---')
-    @JungleExperiment(reps=1, n=[100, 500])
-    def test_sort_n(self, n=100, seed=1234):
-        ''' Test sorting an iterable of size n with a random distribution '''
-        # make data to sort with random distribution
-        np.random.seed(seed)
-        list_2_sort = list(np.random.randn(n))
-
-        @JungleProfiler()
+    @JungleExperiment(reps=8, n=[100, 500, 1000, 5000], fixtures={'list_2_sort': random_list})
+    def test_sort_n(self, n=100, seed=1234, list_2_sort=None):
+        ''' Test sorting an iterable of size n with a random distribution, list_2_sort is built by the fixture '''
+
+        @JungleProfiler(other_funcs=[self.sort])
         def sort_n(l):
             sorted_list = self.sort(l)
             return sorted_list
@@ -28,12 +45,29 @@ class Sorting_Prototype:
         return sort_status
 
     print('\n---Test Block Sort---')
-    @JungleExperiment(reps=1, n_blocks=[2, 4], block_size=[50, 100])
-    @JungleProfiler()
-    def test_block_random_sort(self, n_blocks=4, block_size=100):
-        print('n_blocks: %s' % n_blocks)
-        print('block_size: %s' % block_size)
-        return 'something'
+    @JungleExperiment(reps=8, n_blocks=[2, 4], block_size=[50, 100], fixtures={'array_2_sort': block_array})
+    def test_block_random_sort(self, n_blocks=4, block_size=100, seed=1234, array_2_sort=None):
+        ''' Test sorting n_blocks sorted blocks of block_size values put in a random order '''
+
+        @JungleProfiler(other_funcs=[self.sort])
+        def sort_blocks(a):
+            return self.sort(a)
+
+        sorted_array, _ = sort_blocks(array_2_sort)
+        return is_sorted(sorted_array)
+
+    print('\n---Test Presorted Sort---')
+    @JungleExperiment(reps=8, n=[10000], presortedness=[0., 0.5, 0.9, 0.99, 1.], duplicate_ratio=[0., 0.5, 0.99],
+                      fixtures={'array_2_sort': workload})
+    def test_presorted_sort(self, n=10000, presortedness=0., duplicate_ratio=0., seed=1234, array_2_sort=None):
+        ''' Test sorting inputs that are partly sorted already (the R dimension) and have duplicates '''
+
+        @JungleProfiler(other_funcs=[self.sort])
+        def sort_presorted(a):
+            return self.sort(a)
+
+        sorted_array, _ = sort_presorted(array_2_sort)
+        return is_sorted(sorted_array)
 
 
 
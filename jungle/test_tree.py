@@ -1,189 +1,439 @@
 '''
 Script Purpose:
 Traverse content directory looking for classes that inherit from prototype classes and have test methods wrapped by JungleController.
-If no modification has been made to a content file since last successful run of test_tree.py it will not be re run. (No Wasted Effort)
+Each (prototype, test, implementation) is keyed by a hash of the code it runs and the machine it runs on. If that hash
+hasn't changed since the last successful run of test_tree.py the stored result is reused instead. (No Wasted Effort)
+
+Tests are discovered by parsing the files of the content directory rather than importing them, and the parsed index
+of every file is cached by the file's hash. Only the modules of tests that need running are imported.
 
 Definitions:
 Prototype Classes = classes with 'proto' in their name
 Test Methods = Bound methods belonging to a class that inherits from a prototype class
 '''
+import ast
 import glob
+import math
 import copy
+import hashlib
 import importlib
-from jungle.utils.jungleprofiler import JungleExperiment, JungleEncoder
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from jungle.utils.jungleprofiler import JungleExperiment, ExperimentResult, JungleEncoder, get_platform_specs, get_python_version, \
+    stream_runs_to
+from jungle.utils.sink import RunSink
 import json
 from json.decoder import JSONDecodeError
 import os
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
+from jungle.utils.analysis import compare_scaling
+
+# Directory of the jungle package, whose modules are hashed along with the code directory's when tests import them
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_test(module_text, obj_base_name, test_name, obj_name, test_hash, results_dir, session):
+    '''
+    Run a single test of a prototype implementation, importing its module if this process hasn't already
+    Each run is appended to the module/prototype/test partition of the RunSink in results_dir as soon as it finishes
+    '''
+    module = importlib.import_module(module_text)
+    test_method = getattr(getattr(module, obj_name)(), test_name)
+    print('\t\tTest Method: %s' % test_method)
+    sink = RunSink(results_dir)
+    try:
+        with stream_runs_to(sink, (module_text, obj_base_name, test_name), session=session, implementation=obj_name,
+                            hash=test_hash):
+            return test_method()
+    finally:
+        sink.close()
+
+
+def is_test(name):
+    return 'test' in name.lower()
+
+
+def index_source(source, module_text):
+    '''
+    Statically index the classes, tests and dependencies of a module's source
+    :return: JSON-able dict with
+        classes: class name -> bases (source of each base expression), support (source of every statement of the class
+            body but its tests) and tests (test name -> source, decorators included, and the literal kwargs of its
+            JungleExperiment decorator)
+        support: source of the module level statements outside of classes with tests and implementation classes,
+            leaving out the if __name__ == '__main__' block
+        names: local name -> [module, name] of every from import, modules: local name -> module of every import
+        imports: every module the source may import, including the possible submodules of from imports
+    '''
+    tree = ast.parse(source)
+    index = {'classes': {}, 'support': [], 'names': {}, 'modules': {}, 'imports': []}
+    package = module_text.split('.')
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                index['imports'].append(alias.name)
+                index['modules'][alias.asname or alias.name.split('.')[0]] = alias.name if alias.asname \
+                    else alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom):
+            module = '.'.join(package[:-node.level] + ([node.module] if node.module else [])) if node.level \
+                else node.module
+            index['imports'].append(module)
+            for alias in node.names:
+                index['names'][alias.asname or alias.name] = [module, alias.name]
+                index['imports'].append('%s.%s' % (module, alias.name))
+
+    for node in tree.body:
+        if isinstance(node, ast.If) and '__main__' in ast.get_source_segment(source, node.test):
+            continue
+        if not isinstance(node, ast.ClassDef):
+            index['support'].append(ast.get_source_segment(source, node))
+            continue
+        klass = {'bases': [ast.unparse(base) for base in node.bases], 'support': [], 'tests': {}}
+        for stmt in node.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)) and is_test(stmt.name):
+                klass['tests'][stmt.name] = {
+                    'source': '\n'.join([ast.get_source_segment(source, dec) for dec in stmt.decorator_list]
+                                        + [ast.get_source_segment(source, stmt)]),
+                    'grid': experiment_grid(source, stmt)
+                }
+            else:
+                klass['support'].append(ast.get_source_segment(source, stmt))
+        index['classes'][node.name] = klass
+        if not klass['tests'] and not is_implementation(klass['bases']):
+            index['support'].append(ast.get_source_segment(source, node))
+    return index
+
+
+def experiment_grid(source, function_node):
+    ''' kwargs of a function's JungleExperiment decorator, as literals or as source when they aren't literals '''
+    grid = {}
+    for dec in function_node.decorator_list:
+        if isinstance(dec, ast.Call) and ast.unparse(dec.func).split('.')[-1] == 'JungleExperiment':
+            for keyword in dec.keywords:
+                try:
+                    grid[keyword.arg] = ast.literal_eval(keyword.value)
+                except ValueError:
+                    grid[keyword.arg] = ast.get_source_segment(source, keyword.value)
+    return grid
 
-sns.set_style('whitegrid')
+
+def is_implementation(bases):
+    ''' Classes that inherit from a prototype class, given the names of their bases '''
+    return 'proto' in ' - '.join(bases).lower()
 
 
 class TestTreeAutomation:
     ''' Automation Code for discovering test functions used in conjunction with JungleController '''
 
-    def __init__(self, dev=False):
+    def __init__(self, dev=False, workers=None, reports=True):
+        '''
+        :param dev: rerun every test, ignoring cached results
+        :param workers: number of worker processes to run tests in, None runs them one after another in this process
+        :param reports: render the report figures
+        '''
         directory = 'code'
-        self.json_mod_log = 'content_mod_log.json'
+        self.directory = os.path.abspath(directory)
+        self.cache_index_path = 'test_cache.json'
+        self.cache_dir = '.jungle_cache'
         self.file_dict_path = 'test_tree.json'
-        self.file_mod_dict = {}
+        self.discovery_index_path = 'discovery_index.json'
+        self.results_dir = 'results'
+        self.report_dir = 'reports'
+        self.scaling_baseline_path = 'scaling_baseline.json'
+        self.regressions = {}
+        self.dependency_files = {}  # file -> files it imports, see dependencies
+        self.session = datetime.datetime.now().isoformat()
+        self.cache_index = {}
         self.dev = dev
+        self.workers = workers
+        self.reports = reports
+        self.fingerprint = get_platform_specs() + get_python_version()
 
-        # Load File Mod Log
+        # Load Cache Index
         self.load()
 
-        # Iterate over all of the files in content
+        # Iterate over all of the files in content to build the tests that need running, then run them
+        tasks = []
         for filename in glob.iglob('%s/**/*.py' % directory, recursive=True):
-            if self.isfile_modified(filename) or self.dev:
-                print('File %s has been modified since last TestTreeAutomation Call' % filename)
-                self.test_file(filename)
-            else:
-                print('File %s has NOT been modified since last TestTreeAutomation Call' % filename)
+            tasks.extend(self.test_file(filename))
+        self.run_tasks(tasks)
 
-        # Write the Test Tree and File Mod Log to JSONs
+        # Write the Test Tree and Cache Index to JSONs
         self.post_process()
         self.write()
 
     def load(self):
-        ''' Load Mod Log and prior TestTree '''
-        # Mod Log
+        ''' Load Cache Index, results of unchanged tests are loaded from the cache as they are discovered '''
         try:
-            with open(self.json_mod_log, mode='r') as f:
-                self.old_file_mod_dict = json.load(f)
-        except FileNotFoundError:
-            self.old_file_mod_dict = {}
-        # Last TestTree
+            with open(self.cache_index_path, mode='r') as f:
+                self.old_cache_index = json.load(f)
+        except (FileNotFoundError, JSONDecodeError):
+            self.old_cache_index = {}
         try:
-            with open(self.file_dict_path, mode='r') as f:
-                self.file_dict = json.load(f)
+            with open(self.discovery_index_path, mode='r') as f:
+                self.discovery_index = json.load(f)
         except (FileNotFoundError, JSONDecodeError):
-            self.file_dict = {}
-
-    def isfile_modified(self, filename):
-        ''' Check if file needs to be updated, also update the last modified '''
-
-        latest_mod_time = os.stat(filename).st_mtime
-        # update last mod time
-        self.file_mod_dict[filename] = latest_mod_time
-
+            self.discovery_index = {}
         try:
-            if latest_mod_time <= self.old_file_mod_dict[filename]:
-                return False
-        except KeyError:
-            print('New File Found: %s' % filename)
-        return True
+            with open(self.scaling_baseline_path, mode='r') as f:
+                self.scaling_baseline = json.load(f)
+        except (FileNotFoundError, JSONDecodeError):
+            self.scaling_baseline = {}
+        self.file_dict = {}
+
+    def discover(self, filename):
+        ''' Static index of a file, see index_source, reparsed only when the file's content changed '''
+        with open(filename, mode='rb') as f:
+            source = f.read()
+        file_hash = hashlib.sha256(source).hexdigest()
+        entry = self.discovery_index.get(filename)
+        if entry is None or entry['hash'] != file_hash or 'imports' not in entry:
+            if os.path.isabs(filename):  # a module of the jungle package
+                module_text = os.path.relpath(os.path.splitext(filename)[0], os.path.dirname(PACKAGE_DIR))
+                module_text = module_text.replace(os.sep, '.').replace('.__init__', '')
+            else:
+                module_text = os.path.splitext(filename)[0].replace('\\', '.').replace('/', '.')
+            entry = dict(index_source(source.decode(), module_text), hash=file_hash, module=module_text)
+            self.discovery_index[filename] = entry
+        return entry
+
+    def module_file(self, module_text):
+        '''
+        File of a module under the code directory, or absolute path of a module of the jungle package, None for modules
+        from anywhere else. Found from the module name alone, nothing is imported
+        '''
+        if not module_text:
+            return None
+        path = os.path.join(*module_text.split('.'))
+        for filename in (path + '.py', os.path.join(path, '__init__.py')):
+            if os.path.isfile(filename) and os.path.abspath(filename).startswith(self.directory):
+                return filename
+        if module_text.split('.')[0] == os.path.basename(PACKAGE_DIR):
+            path = os.path.join(os.path.dirname(PACKAGE_DIR), path)
+            for filename in (path + '.py', os.path.join(path, '__init__.py')):
+                if os.path.isfile(filename):
+                    return filename
+        return None
+
+    def dependencies(self, filename):
+        ''' Files of the code directory and jungle package modules a file imports, directly or through one another '''
+        if filename not in self.dependency_files:
+            found, todo = set(), [filename]
+            while todo:
+                for module in self.discover(todo.pop())['imports']:
+                    local_file = self.module_file(module)
+                    if local_file is not None and local_file != filename and local_file not in found:
+                        found.add(local_file)
+                        todo.append(local_file)
+            self.dependency_files[filename] = sorted(found)
+        return self.dependency_files[filename]
+
+    def resolve_class(self, entry, base):
+        ''' (file, class name) of the class a base expression of a class in entry refers to, None if not local '''
+        if base in entry['classes']:
+            return self.module_file(entry['module']), base
+        head, _, attr = base.rpartition('.')
+        if not head and base in entry['names']:
+            module, name = entry['names'][base]
+        elif head in entry['modules']:
+            module, name = entry['modules'][head], attr
+        else:
+            return None
+        filename = self.module_file(module)
+        if filename is None or name not in self.discover(filename)['classes']:
+            return None
+        return filename, name
+
+    def class_chain(self, filename, class_name):
+        ''' (file, class name) of a class and of every local class it inherits from, depth first '''
+        chain = [(filename, class_name)]
+        entry = self.discover(filename)
+        for base in entry['classes'][class_name]['bases']:
+            resolved = self.resolve_class(entry, base)
+            if resolved is not None and resolved not in chain:
+                chain.extend(link for link in self.class_chain(*resolved) if link not in chain)
+        return chain
+
+    def test_hash(self, chain, test_name):
+        '''
+        Hash everything running test_name of the first class of chain depends on, from source alone: the class's name
+        (so implementations with identical bodies don't share a stored result), the test's source and JungleExperiment
+        settings, the non test code of every class in the chain (e.g. sort), the module level code of their files,
+        the code directory and jungle package files those import, directly or not (e.g. workload generators and the
+        profiler itself), and the platform and interpreter
+        '''
+        parts = [self.fingerprint, chain[0][1]]
+        test_source = None
+        for filename, class_name in chain:
+            klass = self.discover(filename)['classes'][class_name]
+            if test_source is None and test_name in klass['tests']:
+                test_source = klass['tests'][test_name]['source']  # the definition closest to the implementation
+                parts.append(test_source)
+            parts.extend(klass['support'])
+
+        files = sorted(set(filename for filename, _ in chain))
+        for filename in files:
+            parts.extend(self.discover(filename)['support'])
+        for dependency in sorted(set(dep for filename in files for dep in self.dependencies(filename)) - set(files)):
+            parts.append(self.discover(dependency)['hash'])
+
+        return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
 
     def test_file(self, filename):
-        ''' Discover and complete tests '''
-
-        module_text = filename.replace('\\', '.').strip('.py')
+        '''
+        Discover the tests of a file, adding cached results of tests whose hash hasn't changed to the file dict
+        :return: list of (module, prototype, test, implementation, hash) tasks for the tests that need running
+        '''
+        entry = self.discover(filename)
+        module_text = entry['module']
         print('\nFile: %s\tSanitized: %s' % (filename, module_text))
-        temp_module = importlib.import_module(module_text)
-
-        prototypes = {}
-
-        for obj_name in dir(temp_module):
-            obj = getattr(temp_module, obj_name)
-
-            try:
-                obj_base = obj.__bases__
-                obj_base_name = ' - '.join(ob.__name__ for ob in obj_base)
-                local_test_methods = [method for method in dir(obj) if 'test' in method.lower()]
-                print('\n\tObject Name: %s' % obj_name)
-                print('\tObject: %s' % obj)
-                print('\tObject Base: %s' % obj_base_name)
-
-                if 'proto' in obj_base_name.lower():
-                    for test_name in local_test_methods:
-                        print('\t\tTest Name: %s' % test_name)
-                        test_method = getattr(obj(), test_name)
-                        print('\t\tTest Method: %s' % test_method)
-                        try:
-                            test_return = test_method()
-                            print(test_return.__repr__)
-                            if isinstance(test_return, JungleExperiment):
-                                if obj_base_name in prototypes:
-                                    if test_name in prototypes[obj_base_name]:
-                                        prototypes[obj_base_name][test_name].update({obj_name: test_return})
-                                        # prototypes[obj_base_name][test_name][obj_name] = test_return
-                                    else:
-                                        prototypes[obj_base_name][test_name] = {obj_name: test_return}
-                                else:
-                                    prototypes[obj_base_name] = {test_name: {obj_name: test_return}}
-
-                        except Exception as e:
-                            raise e
-            except AttributeError:
-                pass
-
-        if prototypes:
-            self.file_dict[module_text] = prototypes
-        return prototypes
+
+        tasks = []
+        for obj_name, klass in sorted(entry['classes'].items()):
+            # Name bases by the class they resolve to, so aliased imports are recognised and land in the same prototype
+            base_names = [(self.resolve_class(entry, base) or (None, base.split('.')[-1]))[1]
+                          for base in klass['bases']]
+            if not is_implementation(base_names):
+                continue
+            obj_base_name = ' - '.join(base_names)
+            print('\n\tObject Name: %s' % obj_name)
+            print('\tObject Base: %s' % obj_base_name)
+
+            chain = self.class_chain(filename, obj_name)
+            test_names = sorted(set(test_name for link in chain
+                                    for test_name in self.discover(link[0])['classes'][link[1]]['tests']))
+            for test_name in test_names:
+                print('\t\tTest Name: %s' % test_name)
+                cache_key = '%s::%s::%s' % (module_text, obj_name, test_name)
+                test_hash = self.test_hash(chain, test_name)
+                self.cache_index[cache_key] = test_hash
+                task = (module_text, obj_base_name, test_name, obj_name, test_hash)
+
+                test_return = None
+                if not self.dev and self.old_cache_index.get(cache_key) == test_hash:
+                    test_return = self.load_result(test_hash)
+                if test_return is None:
+                    tasks.append(task)
+                else:
+                    print('\t\tTest %s has NOT changed since last TestTreeAutomation Call' % cache_key)
+                    self.add_result(task, test_return)
+
+        return tasks
+
+    def run_tasks(self, tasks):
+        ''' Run every task, in a pool of worker processes if self.workers is set, and add their results '''
+        if self.workers is None:
+            for task in tasks:
+                self.task_done(task, run_test(*task, self.results_dir, self.session))
+            return
+
+        # Spawned workers import the modules they test themselves instead of inheriting this process's imports, and run
+        # a single task each so no module's import side effects or state leak into another task
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                 max_tasks_per_child=1) as pool:
+            futures = {pool.submit(run_test, *task, self.results_dir, self.session): task for task in tasks}
+            for future in as_completed(futures):
+                self.task_done(futures[future], future.result())
+
+    def task_done(self, task, test_return):
+        print('\t\tFinished %s.%s on %s' % (task[1], task[2], task[3]))
+        if isinstance(test_return, ExperimentResult):
+            self.save_result(task[4], test_return)
+            self.add_result(task, test_return)
+
+    def add_result(self, task, test_return):
+        module_text, obj_base_name, test_name, obj_name, _ = task
+        self.file_dict.setdefault(module_text, {}).setdefault(obj_base_name, {}).setdefault(test_name, {})[obj_name] \
+            = test_return
+
+    def load_result(self, test_hash):
+        ''' Stored result of a test hash, None if there isn't one '''
+        try:
+            return JungleExperiment.load(os.path.join(self.cache_dir, '%s.jungle' % test_hash))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save_result(self, test_hash, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        result.dump_(os.path.join(self.cache_dir, '%s.jungle' % test_hash))
 
     def write(self):
         ''' Write data to file '''
 
-        print('Writing Filename Mod Log')
-        with open(self.json_mod_log, mode='w') as out_file:
-            json.dump(self.file_mod_dict, out_file, sort_keys=True, indent=3)
+        print('Writing Cache Index')
+        with open(self.cache_index_path, mode='w') as out_file:
+            json.dump(self.cache_index, out_file, sort_keys=True, indent=3)
+
+        # Runs themselves were already streamed to self.results_dir, the test tree only indexes them
+        print('Writing Discovery Index')
+        with open(self.discovery_index_path, mode='w') as out_file:
+            json.dump(self.discovery_index, out_file, sort_keys=True, indent=3)
 
         print('Writing Test Tree')
         with open(self.file_dict_path, mode='w') as out_file:
             jdump = json.dump(self.file_dict, out_file, sort_keys=True, indent=3, cls=JungleEncoder)
 
+        print('Writing Scaling Baseline')
+        with open(self.scaling_baseline_path, mode='w') as out_file:
+            json.dump(self.scaling_baseline, out_file, sort_keys=True, indent=3)
+
     def post_process(self):
         ''' Scoop all of the related jungle controllers and combine them for reporting'''
+        jobs = []
+        for file, prototype_dicts in self.file_dict.items():
+            for prototype, test_dicts in prototype_dicts.items():
+                prototype_df = self.combine_junglecontrollers(test_dicts)
+                for test, test_df in prototype_df.groupby('Test', sort=False):
+                    jobs.append(('%s/%s/%s' % (file, prototype, test), test_df.dropna(axis=1, how='all')))
+        if self.reports:
+            from jungle.utils.reporting import render_reports  # matplotlib and seaborn are only needed to render
+
+            render_reports(jobs, self.report_dir, workers=self.workers)
+        self.check_scaling()
+
+    def check_scaling(self):
+        '''
+        Fit the scaling law of every (implementation, test) and flag those statistically worse than their baseline fit
+        The first fit of a test becomes its baseline, delete it from the baseline file to accept a new one
+        '''
         for file, prototype_dicts in self.file_dict.items():
             for prototype, test_dicts in prototype_dicts.items():
                 for test, methods_dict in test_dicts.items():
-                    print('Just called post process')
-                    print(test)
-                    print(methods_dict)
-                    print('Calling combine jungle controllers')
-                    self.combine_junglecontrollers(methods_dict)
-
-    def combine_junglecontrollers(self, methods_dict):
-        ''' dict of method keys and JungleController dictionaries'''
-        df_list = []
-        print('---------------------------------------\nMethods Dict')
-        print(methods_dict)
-        for method, jc in methods_dict.items():
+                    for method, result in methods_dict.items():
+                        fit = result.analyze_rundict().get('scaling')
+                        if fit is None or fit['best'] is None:
+                            continue
+                        key = '%s::%s::%s' % (file, method, test)
+                        if not math.isfinite(fit['exponent_se']):
+                            # Two points fit the power law exactly, leaving nothing to test a regression against
+                            print('Scaling %s: untestable from %d runs, needs more sizes or reps' % (key, fit['count']))
+                            continue
+                        print('Scaling %s: best fit %s, exponent %.3f (%.3f, %.3f)'
+                              % (key, fit['best'], fit['exponent'], *fit['exponent_ci']))
+                        if key not in self.scaling_baseline:
+                            self.scaling_baseline[key] = fit
+                            continue
+                        comparison = compare_scaling(self.scaling_baseline[key], fit)
+                        if comparison['regressed']:
+                            self.regressions[key] = comparison
+                            print('\tREGRESSION %s: %.2fx slower at n=%d than baseline (exponent z=%.2f, time z=%.2f)'
+                                  % (key, comparison['ratio'], comparison['n_ref'], comparison['exponent_z'],
+                                     comparison['time_z']))
+
+    def combine_junglecontrollers(self, test_dicts):
+        ''' Concatenate the runs of every test and implementation of a prototype into one frame '''
+        import pandas as pd
 
-            if not isinstance(jc, JungleExperiment):
-                raise TypeError('arg: %s is not of type JungleController' % type(jc))
-            else:
-                cdf = jc.controller_df
+        df_list = []
+        for test, methods_dict in test_dicts.items():
+            for method, jc in methods_dict.items():
+                if not isinstance(jc, ExperimentResult):
+                    raise TypeError('arg: %s is not of type ExperimentResult' % type(jc))
+                cdf = jc.controller_df.drop(columns=['stdout'], errors='ignore')
+                cdf['Test'] = test
                 cdf['Method'] = method
                 df_list.append(cdf)
-
-        concat_df = pd.concat(df_list)
-        sns.set_style('darkgrid')
-        n_colors = len(np.unique(concat_df['Method']))
-        # pal = sns.cubehelix_palette(n_colors, start=.5, rot=-.75)
-        pal = sns.diverging_palette(255, 133, l=60, center="dark", n=n_colors)
-        # pal = sns.color_palette("Set2", n_colors)
-
-        print(concat_df)
-
-        g = sns.FacetGrid(data=concat_df, col="rep", hue='Method', col_wrap=5, size=1.5)
-        g = g.map(plt.plot, "kwarg: n", "walltime", marker=".")
-        plt.show()
-
-        g = sns.factorplot(data=concat_df, x='kwarg: n', y='walltime', hue='Method',
-                           palette=pal, shade=True,
-                           size=6, aspect=2, alpha=0.5, capsize=.2)
-        g.despine(offset=10, trim=True)
-        plt.title('Yo yo check it out')
-        plt.show()
-
-        sns.factorplot(data=concat_df, x='index', y='walltime', hue='Method')
-        plt.show()
-
-        sns.factorplot(data=concat_df, x='start_seconds', y='controller walltime', hue='Method')
-        plt.show()
+        return pd.concat(df_list, ignore_index=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+'''
+Tests of the statistics in jungle.utils.analysis against exact values
+'''
+import itertools
+import math
+import numpy as np
+from jungle.utils.analysis import mann_whitney_greater, adjust_pvalues
+
+
+def brute_force_p(x, y):
+    ''' Exact one sided p value by enumerating every split of the pooled ranks '''
+    pooled = np.concatenate([x, y]).astype(float)
+    ranks = np.array([(pooled < v).sum() + ((pooled == v).sum() + 1) / 2 for v in pooled])
+    observed = ranks[:len(x)].sum()
+    splits = list(itertools.combinations(range(len(pooled)), len(x)))
+    return sum(ranks[list(split)].sum() >= observed - 1e-9 for split in splits) / len(splits)
+
+
+def test_complete_separation():
+    # The largest U of n against m samples has probability 1 / C(n + m, n)
+    assert mann_whitney_greater([4, 5, 6], [1, 2, 3]) == (9, 0.05)
+    assert math.isclose(mann_whitney_greater(range(6, 11), range(5))[1], 1 / 252)
+    assert math.isclose(mann_whitney_greater(range(8, 16), range(8))[1], 1 / 12870)
+    assert math.isclose(mann_whitney_greater([3, 4], [1, 2])[1], 1 / 6)
+
+
+def test_known_exact_values():
+    # U = 8 of 3 against 4 samples, 11 of the 35 splits reach it (scipy.stats.mannwhitneyu, method='exact')
+    assert mann_whitney_greater([2, 5, 7], [1, 3, 4, 6])[0] == 8
+    assert math.isclose(mann_whitney_greater([2, 5, 7], [1, 3, 4, 6])[1], 11 / 35)
+    assert math.isclose(mann_whitney_greater([1, 2, 3], [4, 5, 6])[1], 1.)
+
+
+def test_matches_enumeration():
+    rng = np.random.default_rng(0)
+    for n_x, n_y in ((3, 3), (4, 6), (7, 5)):
+        x, y = rng.normal(0.5, 1, n_x), rng.normal(0, 1, n_y)
+        assert math.isclose(mann_whitney_greater(x, y)[1], brute_force_p(x, y))
+
+
+def test_ties_match_enumeration():
+    x, y = [1, 2, 2, 3, 3], [0, 1, 2, 2]
+    assert math.isclose(mann_whitney_greater(x, y)[1], brute_force_p(x, y))
+    assert mann_whitney_greater([1, 1], [1, 1])[1] == 1.
+
+
+def test_empty_and_nan():
+    assert mann_whitney_greater([], [1, 2])[1] == 1.
+    assert mann_whitney_greater([4, 5, np.nan, 6], [1, 2, 3])[1] == 0.05
+
+
+def test_normal_approximation_for_large_samples():
+    rng = np.random.default_rng(1)
+    x, y = rng.normal(0.3, 1, 40), rng.normal(0, 1, 40)
+    u, p = mann_whitney_greater(x, y)
+    sigma = math.sqrt(40 * 40 * 81 / 12)
+    assert math.isclose(p, 0.5 * math.erfc((u - 800 - 0.5) / sigma / math.sqrt(2)))
+
+
+def test_adjust_pvalues():
+    p = [0.01, 0.04, 0.03, 0.005]
+    assert np.allclose(adjust_pvalues(p, 'holm'), [0.03, 0.06, 0.06, 0.02])
+    assert np.allclose(adjust_pvalues(p, 'bh'), [0.02, 0.04, 0.04, 0.02])
+    assert len(adjust_pvalues([], 'holm')) == 0
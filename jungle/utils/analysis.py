@@ -0,0 +1,242 @@
+'''
+Statistics used to schedule and analyze JungleExperiment runs
+Only numpy is required, so these work in worker processes without scipy
+'''
+import math
+from statistics import NormalDist
+import numpy as np
+
+
+def t_quantile(p, df):
+    ''' Quantile p of Student's t distribution with df degrees of freedom '''
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    elif df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    # Cornish-Fisher expansion around the normal quantile, within 1% from 3 degrees of freedom up
+    z = NormalDist().inv_cdf(p)
+    return z + (z ** 3 + z) / (4 * df) \
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2) \
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+
+
+def mean_ci(values, confidence=0.95):
+    '''
+    Mean of values and the half width of its confidence interval
+    :return: (mean, half width), half width is inf with fewer than 2 values
+    '''
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return (values.mean() if len(values) else np.nan), np.inf
+    sem = values.std(ddof=1) / math.sqrt(len(values))
+    return values.mean(), t_quantile(0.5 + confidence / 2, len(values) - 1) * sem
+
+
+def grouped_mean_ci(values, groups, n_groups, confidence=0.95):
+    '''
+    mean_ci of values for every group at once
+    :param groups: int array with the group of each value, from 0 to n_groups - 1
+    :return: (means, half widths) arrays of length n_groups
+    '''
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    values, groups = values[keep], np.asarray(groups)[keep]
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, values, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        squares = np.bincount(groups, (values - means[groups]) ** 2, minlength=n_groups)
+        sems = np.sqrt(squares / (counts - 1) / counts)
+    t = np.array([t_quantile(0.5 + confidence / 2, c - 1) if c > 1 else np.inf for c in counts])
+    half_widths = np.where(counts > 1, t * sems, np.inf)
+    return means, half_widths
+
+
+# Complexity models t = a * g(n) fit through the origin
+COMPLEXITY_MODELS = {
+    'n': lambda n: n,
+    'n log n': lambda n: n * np.log2(n),
+    'n^2': lambda n: n ** 2
+}
+
+
+def fit_scaling(n, t, confidence=0.95):
+    '''
+    Fit the empirical complexity of timings t measured at sizes n
+    Each of COMPLEXITY_MODELS is fit by least squares through the origin, and a power law t = a * n^b by linear
+    regression of log t on log n, which gives the exponent b a confidence interval
+    :return: dict of the power law fit, the AIC of every model and the name of the best one
+    '''
+    n, t = np.asarray(n, dtype=float), np.asarray(t, dtype=float)
+    keep = (n > 0) & (t > 0) & ~np.isnan(n) & ~np.isnan(t)
+    n, t = n[keep], t[keep]
+    count = len(n)
+    fit = {'count': count, 'models': {}}
+    if count < 2 or len(np.unique(n)) < 2:
+        fit.update(exponent=np.nan, exponent_ci=[np.nan, np.nan], best=None)
+        return fit
+
+    for name, g in COMPLEXITY_MODELS.items():
+        x = g(n)
+        a = (x @ t) / (x @ x)
+        rss = ((t - a * x) ** 2).sum()
+        fit['models'][name] = {'a': a, 'aic': count * np.log(max(rss, 1e-300) / count) + 2}
+
+    # Power law in log-log space
+    x, y = np.log(n), np.log(t)
+    log_n_mean = x.mean()
+    sxx = ((x - log_n_mean) ** 2).sum()
+    exponent = ((x - log_n_mean) @ (y - y.mean())) / sxx
+    log_a = y.mean() - exponent * log_n_mean
+    residuals = y - log_a - exponent * x
+    df = count - 2
+    sigma2 = (residuals @ residuals) / df if df > 0 else np.inf
+    exponent_se = np.sqrt(sigma2 / sxx)
+    half_width = t_quantile(0.5 + confidence / 2, df) * exponent_se if df > 0 else np.inf
+    # AIC of the power law in the original scale so it is comparable with the other models. With only two points it
+    # interpolates them exactly, so it isn't a candidate then
+    if df > 0:
+        rss = ((t - np.exp(log_a) * n ** exponent) ** 2).sum()
+        fit['models']['power law'] = {'a': np.exp(log_a), 'aic': count * np.log(max(rss, 1e-300) / count) + 4}
+
+    fit.update(exponent=exponent, exponent_se=exponent_se, exponent_ci=[exponent - half_width, exponent + half_width],
+               log_a=log_a, log_n_mean=log_n_mean, sxx=sxx, sigma2=sigma2, max_n=n.max(),
+               best=min(fit['models'], key=lambda name: fit['models'][name]['aic']))
+    return fit
+
+
+def predict_log_time(fit, n):
+    ''' Power law prediction of log t at size n from a fit_scaling result, with its standard error '''
+    x0 = np.log(n)
+    se = np.sqrt(fit['sigma2'] * (1 / fit['count'] + (x0 - fit['log_n_mean']) ** 2 / fit['sxx']))
+    return fit['log_a'] + fit['exponent'] * x0, se
+
+
+def compare_scaling(baseline, current, alpha=0.05, min_ratio=1.05):
+    '''
+    Check whether the current fit_scaling result is statistically worse than the baseline one
+    Worse means a larger exponent, or a slower predicted time at the largest size measured, that is significant at
+    alpha (one sided z tests) and predicts at least min_ratio times the baseline time at that size
+    :return: dict with the z scores, predicted time ratio and a regressed flag
+    '''
+    comparison = {'regressed': False}
+    if baseline.get('best') is None or current.get('best') is None:
+        return comparison
+    z_crit = NormalDist().inv_cdf(1 - alpha)
+
+    exponent_se = np.hypot(baseline['exponent_se'], current['exponent_se'])
+    exponent_z = (current['exponent'] - baseline['exponent']) / exponent_se if exponent_se > 0 else 0.
+
+    n_ref = current['max_n']
+    base_log_t, base_se = predict_log_time(baseline, n_ref)
+    cur_log_t, cur_se = predict_log_time(current, n_ref)
+    time_se = np.hypot(base_se, cur_se)
+    time_z = (cur_log_t - base_log_t) / time_se if time_se > 0 else 0.
+    ratio = np.exp(cur_log_t - base_log_t)
+
+    comparison.update(exponent_z=exponent_z, time_z=time_z, ratio=ratio, n_ref=n_ref,
+                      regressed=bool(max(exponent_z, time_z) > z_crit and ratio >= min_ratio))
+    return comparison
+
+
+def mann_whitney_greater(x, y, exact_below=50):
+    '''
+    One sided Mann-Whitney U test of whether values x tend to be larger than values y
+    The p value is exact, from the permutation distribution of the ranks (ties included), when there are fewer than
+    exact_below values in all. Larger samples use the normal approximation of U with tie and continuity corrections
+    :return: (U statistic of x, p value), p is 1 when either sample is empty
+    '''
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    x, y = x[~np.isnan(x)], y[~np.isnan(y)]
+    n_x, n_y = len(x), len(y)
+    if n_x == 0 or n_y == 0:
+        return np.nan, 1.
+
+    # Average ranks of the pooled sample, ties share the mean of the ranks they span
+    pooled = np.concatenate([x, y])
+    uniques, inverse, tie_counts = np.unique(pooled, return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(tie_counts) - (tie_counts - 1) / 2
+    u = average_ranks[inverse[:n_x]].sum() - n_x * (n_x + 1) / 2
+
+    n = n_x + n_y
+    if n < exact_below:
+        return u, _exact_rank_sum_p(2 * average_ranks[inverse], n_x)
+    tie_term = (tie_counts ** 3 - tie_counts).sum() / (n * (n - 1))
+    sigma = math.sqrt(n_x * n_y / 12 * (n + 1 - tie_term))
+    if sigma == 0:
+        return u, 1.
+    z = (u - n_x * n_y / 2 - 0.5) / sigma
+    return u, 1 - NormalDist().cdf(z)
+
+
+def _exact_rank_sum_p(doubled_ranks, n_x):
+    '''
+    P(rank sum of n_x values drawn without replacement from the pooled ranks >= the sum of the first n_x ranks)
+    Ranks are doubled so ties' half ranks are integers. counts[k, s] is the number of subsets of k ranks summing to s
+    '''
+    doubled_ranks = np.round(doubled_ranks).astype(np.int64)
+    observed = doubled_ranks[:n_x].sum()
+    counts = np.zeros((n_x + 1, doubled_ranks.sum() + 1))
+    counts[0, 0] = 1
+    for rank in doubled_ranks:
+        counts[1:, rank:] += counts[:-1, :counts.shape[1] - rank]  # numpy buffers the overlapping slices
+    return min(counts[n_x, observed:].sum() / math.comb(len(doubled_ranks), n_x), 1.)
+
+
+def adjust_pvalues(p_values, method='holm'):
+    '''
+    p values adjusted for testing them all at once, compare them with alpha as they are
+    :param method: 'holm' controls the chance of any false positive, 'bh' (Benjamini-Hochberg) the expected share of
+        false positives among the positives
+    :return: array of adjusted p values, in the order given
+    '''
+    p_values = np.asarray(p_values, dtype=float)
+    m = len(p_values)
+    if m == 0:
+        return p_values
+    order = np.argsort(p_values)
+    ranked = p_values[order]
+    if method == 'holm':
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method == 'bh':
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError('method: %s should be \'holm\' or \'bh\'' % method)
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.)
+    return result
+
+
+def fit_drift(values, order, groups, n_groups, confidence=0.95):
+    '''
+    Linear drift of values over order (run index or start time) once every group (kwarg cell) has its own mean
+    Groups are absorbed by demeaning values and order within each group, which is the same least squares slope as
+    regressing on group dummies plus order
+    :return: dict of the slope per unit of order, its standard error, t statistic, confidence interval, and the drift
+    over the whole span of order as a percentage of the mean value
+    '''
+    values, order = np.asarray(values, dtype=float), np.asarray(order, dtype=float)
+    keep = ~np.isnan(values) & ~np.isnan(order)
+    values, order, groups = values[keep], order[keep], np.asarray(groups)[keep]
+    drift = {'slope': np.nan, 'slope_se': np.nan, 't': np.nan, 'slope_ci': [np.nan, np.nan], 'drift_pct': np.nan}
+    counts = np.bincount(groups, minlength=n_groups)
+    df = len(values) - np.count_nonzero(counts) - 1
+    if df < 1:
+        return drift
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value_means = np.bincount(groups, values, minlength=n_groups) / counts
+        order_means = np.bincount(groups, order, minlength=n_groups) / counts
+    value_dev, order_dev = values - value_means[groups], order - order_means[groups]
+    sxx = order_dev @ order_dev
+    if sxx == 0:
+        return drift
+    slope = (order_dev @ value_dev) / sxx
+    residuals = value_dev - slope * order_dev
+    slope_se = math.sqrt((residuals @ residuals) / df / sxx)
+    half_width = t_quantile(0.5 + confidence / 2, df) * slope_se
+    drift.update(slope=slope, slope_se=slope_se, t=slope / slope_se if slope_se > 0 else np.inf,
+                 slope_ci=[slope - half_width, slope + half_width],
+                 drift_pct=100 * slope * (order.max() - order.min()) / values.mean())
+    return drift
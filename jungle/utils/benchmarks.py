@@ -0,0 +1,87 @@
+'''
+Benchmarks for the overhead Jungle itself adds on top of the code it profiles
+Run with: python -m jungle.utils.benchmarks
+'''
+import subprocess
+import sys
+import time
+import random
+from jungle.utils.jungleprofiler import JungleExperiment, JungleProfiler
+
+
+def _setprofile_call(func, *args, **kwargs):
+    ''' Call func the way JungleExperiment used to, under a sys.setprofile tracer copying f_locals on every return '''
+    saved = {}
+
+    def tracer(frame, event, arg):
+        if event == 'return':
+            saved['locals'] = frame.f_locals.copy()
+
+    sys.setprofile(tracer)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sys.setprofile(None)
+
+
+@JungleProfiler(autorange=False)
+def _profiled_sort(l):
+    return sorted(l)
+
+
+def _sort_and_check(n=1000):
+    ''' Body shaped like Sorting_Prototype.test_sort_n: profiled sort followed by a sortedness check '''
+    random.seed(1234)
+    list_2_sort = [random.random() for _ in range(n)]
+    sorted_list, _ = _profiled_sort(list_2_sort)
+    return all(sorted_list[i] <= sorted_list[i + 1] for i in range(len(sorted_list) - 1))
+
+
+def _best_of(func, repeat, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_profile_collection(n=10000, repeat=50):
+    ''' Compare the cost of collecting JungleProfiler results with a sys.setprofile tracer vs the run context '''
+    untraced = _best_of(_sort_and_check, repeat, n)
+    traced = _best_of(lambda n: _setprofile_call(_sort_and_check, n), repeat, n)
+
+    experiment = JungleExperiment(reps=repeat, n=[n])
+    result = experiment(_sort_and_check)()
+    controller = result.controller_df['controller walltime'].min()
+
+    print('\n--- Profile collection overhead (n=%d, best of %d) ---' % (n, repeat))
+    print('No collection:\t\t%.6fs' % untraced)
+    print('sys.setprofile tracer:\t%.6fs (+%.1f%%)' % (traced, 100 * (traced - untraced) / untraced))
+    print('Run context:\t\t%.6fs (+%.1f%%)' % (controller, 100 * (controller - untraced) / untraced))
+    return {'untraced': untraced, 'setprofile': traced, 'context': controller}
+
+
+def _cold_import_time(statement, repeat):
+    ''' Best of repeat fresh interpreters of the seconds statement takes, timed inside the child process '''
+    code = 'import time; t0 = time.perf_counter(); %s; print(time.perf_counter() - t0)' % statement
+    return min(float(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout)
+               for _ in range(repeat))
+
+
+def bench_import_time(repeat=5):
+    '''
+    Compare the cold start of importing jungle with the heavy dependencies it used to import up front, which is what
+    every spawned worker process pays before its first run
+    '''
+    lazy = _cold_import_time('import jungle', repeat)
+    eager = _cold_import_time('import jungle, pandas, seaborn, line_profiler, memory_profiler', repeat)
+    print('\n--- Cold import time (best of %d interpreters) ---' % repeat)
+    print('import jungle:\t\t\t%.3fs' % lazy)
+    print('with heavy dependencies:\t%.3fs (%.1fx)' % (eager, eager / lazy))
+    return {'lazy': lazy, 'eager': eager}
+
+
+if __name__ == '__main__':
+    bench_profile_collection()
+    bench_import_time()
@@ -0,0 +1,116 @@
+'''
+Streams that stdout is redirected to while a JungleProfiler times its body
+Every policy counts the writes made to it and the nanoseconds they took, so the cost of printing can be reported
+apart from the body's own time
+'''
+import collections
+import io
+import multiprocessing.util
+import os
+import sys
+import tempfile
+import time
+
+POLICIES = ('memory', 'discard', 'ring', 'spool', 'passthrough')
+
+
+def check_policy(policy):
+    if policy not in POLICIES:
+        raise ValueError('capture policy: %s should be one of %s' % (policy, POLICIES))
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Temporary spool files of this process, removed when it exits. Tracked by a multiprocessing finalizer rather than
+# atexit so pool worker processes remove theirs too, each process starts its own list
+_spool_files = []
+_spool_pid = None
+
+
+def _track_spool(path):
+    global _spool_files, _spool_pid
+    if _spool_pid != os.getpid():
+        _spool_files, _spool_pid = [], os.getpid()
+        multiprocessing.util.Finalize(None, _remove_files, args=(_spool_files,), exitpriority=0)
+    _spool_files.append(path)
+
+
+class CaptureStream(io.TextIOBase):
+    '''
+    Text stream stdout is redirected to
+    'memory' keeps everything written, 'discard' nothing, 'ring' the last limit characters, 'spool' writes to a
+    temporary file and 'passthrough' to the stdout in place when the stream was created
+    '''
+
+    def __init__(self, policy='memory', limit=65536, spool_dir=None):
+        '''
+        :param limit: characters kept by the 'ring' policy
+        :param spool_dir: directory the 'spool' policy writes to and keeps its file in. With None the file is a
+            temporary one, removed when the process that created it exits
+        '''
+        check_policy(policy)
+        self.policy = policy
+        self.limit = limit
+        self.target = sys.stdout if policy == 'passthrough' else None
+        self.spool = None
+        if policy == 'spool':
+            self.spool = tempfile.NamedTemporaryFile(mode='w', prefix='jungle_stdout_', suffix='.txt', dir=spool_dir,
+                                                     delete=False)
+            if spool_dir is None:
+                _track_spool(self.spool.name)
+        self.reset()
+
+    def reset(self):
+        ''' Drop what was captured so far and zero the counters '''
+        self.chunks = collections.deque()
+        self.n_chars = 0  # characters held in chunks
+        self.ns = 0
+        self.writes = 0
+        self.chars = 0
+        if self.spool is not None:
+            self.spool.seek(0)
+            self.spool.truncate()
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        t0 = time.perf_counter_ns()
+        if self.policy == 'memory':
+            self.chunks.append(s)
+        elif self.policy == 'ring':
+            self.chunks.append(s)
+            self.n_chars += len(s)
+            while self.n_chars - len(self.chunks[0]) >= self.limit:
+                self.n_chars -= len(self.chunks.popleft())
+        elif self.policy == 'spool':
+            self.spool.write(s)
+        elif self.policy == 'passthrough':
+            self.target.write(s)
+        self.ns += time.perf_counter_ns() - t0
+        self.writes += 1
+        self.chars += len(s)
+        return len(s)
+
+    def getvalue(self):
+        '''
+        What was captured: the text for 'memory' and 'ring' (its last limit characters), the path of the file for
+        'spool' and None for 'discard' and 'passthrough'
+        '''
+        if self.policy in ('memory', 'ring'):
+            return ''.join(self.chunks)[-self.limit if self.policy == 'ring' else 0:]
+        elif self.policy == 'spool':
+            self.spool.flush()
+            return self.spool.name
+        return None
+
+    def close(self):
+        if self.spool is not None:
+            self.spool.close()
+        super().close()
@@ -0,0 +1,165 @@
+'''
+Experimental designs choosing which cells of a JungleExperiment kwargs grid get run
+Every design lazily yields kwarg dicts (without a rep) from a dict of kwarg name -> list of levels
+'''
+import itertools
+import math
+import random
+
+MASK64 = (1 << 64) - 1
+
+
+def grid_size(kwargs):
+    ''' Number of cells in the full factorial grid of kwargs '''
+    return math.prod(len(levels) for levels in kwargs.values())
+
+
+def grid_cell(kwargs, index):
+    ''' Cell number index of the full factorial grid, in itertools.product order over the sorted kwarg names '''
+    arg_names = sorted(kwargs)
+    cell = {}
+    for arg in reversed(arg_names):
+        index, level = divmod(index, len(kwargs[arg]))
+        cell[arg] = kwargs[arg][level]
+    return {arg: cell[arg] for arg in arg_names}
+
+
+def full_factorial(kwargs, budget, rng):
+    ''' Every combination of kwargs, budget is ignored '''
+    arg_names = sorted(kwargs)
+    for vals in itertools.product(*(kwargs[arg] for arg in arg_names)):
+        yield dict(zip(arg_names, vals))
+
+
+def random_subset(kwargs, budget, rng):
+    ''' budget distinct cells drawn uniformly from the full factorial grid '''
+    order = IndexPermutation(grid_size(kwargs), rng.getrandbits(64))
+    for k in range(min(budget, len(order))):
+        yield grid_cell(kwargs, order[k])
+
+
+def latin_hypercube(kwargs, budget, rng):
+    ''' budget cells where each kwarg's levels are spread evenly, Latin hypercube style, across the cells '''
+    arg_names = sorted(kwargs)
+    strata = {}
+    for arg in arg_names:
+        strata[arg] = list(range(budget))
+        rng.shuffle(strata[arg])
+    for k in range(budget):
+        yield {arg: kwargs[arg][strata[arg][k] * len(kwargs[arg]) // budget] for arg in arg_names}
+
+
+def fractional_factorial(kwargs, budget, rng):
+    '''
+    Regular fraction of the full factorial grid holding about budget cells
+    Keeps the cells whose level indices sum to a random residue modulo m. Every level of every kwarg is equally
+    represented when m divides the number of levels of at least two kwargs, so the largest such m that doesn't
+    undershoot the budget is used, which can leave more than budget cells
+    '''
+    arg_names = sorted(kwargs)
+    levels = [len(kwargs[arg]) for arg in arg_names]
+    target = max(1, grid_size(kwargs) // budget)
+    balanced = [m for m in range(2, target + 1) if sum(n % m == 0 for n in levels) >= 2]
+    modulus = max(balanced) if balanced else target
+    residue = rng.randrange(modulus)
+    for level_indices in itertools.product(*(range(n) for n in levels)):
+        if sum(level_indices) % modulus == residue:
+            yield {arg: kwargs[arg][level] for arg, level in zip(arg_names, level_indices)}
+
+
+def _mix(x):
+    ''' splitmix64 finalizer, scrambles a 64 bit integer '''
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class IndexPermutation(object):
+    '''
+    Pseudo-random permutation of range(size) computed one index at a time in O(1) memory
+    A balanced Feistel network permutes the smallest even-bit power of 2 domain holding size, and indices landing
+    past size are re-encrypted until they fall back inside it (cycle walking), which is fewer than 4 rounds on average
+    '''
+    rounds = 4
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self.half_bits = (max(size - 1, 1).bit_length() + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.keys = [_mix(seed + r) for r in range(self.rounds)]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('index %d out of range for a permutation of %d' % (index, self.size))
+        while True:
+            index = self._encrypt(index)
+            if index < self.size:
+                return index
+
+    def _encrypt(self, x):
+        left, right = x >> self.half_bits, x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.mask)
+        return (left << self.half_bits) | right
+
+
+class TestSequence(object):
+    '''
+    Lazy sequence of the kwarg dicts (cell and rep) of every run of a design, in a seeded pseudo-random order
+    Runs are decoded from their position on demand: a permutation maps it to a (cell, rep) index, and full factorial
+    and random cells are decoded from the mixed radix grid index, so memory doesn't grow with the grid. Other designs
+    hold the budget cells they pick
+    '''
+
+    def __init__(self, kwargs, design, budget, reps, seed):
+        self.kwargs = kwargs
+        self.design = design
+        self.reps = reps
+        self.seed = seed
+        if design == 'full':
+            self.cells = None  # cell index is the grid index
+            n_cells = grid_size(kwargs)
+        elif design == 'random':
+            self.cells = IndexPermutation(grid_size(kwargs), _mix(seed ^ 1))  # first budget grid indices
+            n_cells = min(budget, grid_size(kwargs))
+        else:
+            self.cells = list(DESIGNS[design](kwargs, budget, random.Random(seed)))
+            n_cells = len(self.cells)
+        self.n_cells = n_cells
+        self.order = IndexPermutation(n_cells * reps, seed)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        cell, rep = divmod(self.order[index], self.reps)
+        return dict(self.cell(cell), rep=rep)
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, start):
+        ''' Lazily yield the kwarg dicts from position start on, e.g. to resume an interrupted sweep '''
+        for index in range(start, len(self)):
+            yield self[index]
+
+    def cell(self, k):
+        ''' kwarg dict of cell number k of the design '''
+        if isinstance(self.cells, list):
+            return self.cells[k]
+        return grid_cell(self.kwargs, k if self.cells is None else self.cells[k])
+
+
+DESIGNS = {
+    'full': full_factorial,
+    'random': random_subset,
+    'lhs': latin_hypercube,
+    'fractional': fractional_factorial
+}
@@ -0,0 +1,167 @@
+'''
+Memoized test inputs for JungleExperiment
+A fixture is a function building an input of the test (e.g. the list to sort) from some of the test's kwargs. Its
+outputs are cached by (fixture, kwargs, seed) so reps and implementations sharing an experiment build them once, and
+every run is handed its own copy so in place changes don't leak into the next run
+'''
+import collections
+import copy
+import glob
+import hashlib
+import os
+import sys
+import tempfile
+import weakref
+import numpy as np
+
+
+def shared_dir():
+    ''' Directory shared arrays are published to, in memory on Linux '''
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def fixture_id(fixture):
+    '''
+    Name of a fixture that is the same in every process: its module and qualname, plus its code, constants and closure
+    so lambdas or closures sharing a qualname get different names
+    '''
+    func = getattr(fixture, '__func__', fixture)
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return '%s.%s' % (fixture.__module__, fixture.__qualname__)
+    closure = tuple(cell.cell_contents for cell in func.__closure__ or ())
+    return repr((func.__module__, func.__qualname__, code.co_code, code.co_consts, closure,
+                 getattr(fixture, '__self__', None)))
+
+
+def nbytes(value):
+    ''' Approximate memory held by a fixture output '''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)) and value:
+        size += len(value) * sys.getsizeof(value[0])
+    return size
+
+
+class FixtureCache(object):
+    '''
+    LRU cache of fixture outputs bounded by number of entries and by bytes
+    With shared, arrays are published as .npy files named after namespace in shared_dir() and every run maps them
+    copy-on-write (np.load(mmap_mode='c')), so worker processes read the same pages without copying them and a run
+    writing to its input only copies the pages it touches. Otherwise arrays are handed out as copies
+    The limits cover published files too: the process that wrote a file deletes it when evicting its entry, other
+    processes rebuild or republish it if they need it again. Files left under the namespace are deleted when the cache
+    is garbage collected or its process exits, so every call of an experiment (and every implementation sharing it)
+    reuses them until then
+    '''
+
+    def __init__(self, max_entries=32, max_bytes=2 ** 28, shared=False, namespace=None):
+        '''
+        :param namespace: prefix of the published files, defaults to jungle_<pid> of the process creating the cache.
+            Workers are given the namespace of the process they work for so they find its files
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        if shared and namespace is None:
+            # Caches given a namespace only borrow it, its owner deletes its files, from its own process only
+            weakref.finalize(self, _remove_namespace, 'jungle_%d' % os.getpid(), os.getpid())
+        self.namespace = namespace or 'jungle_%d' % os.getpid()
+        self.entries = collections.OrderedDict()  # key -> (value or published path, bytes, published)
+        self.written = set()  # paths of the files this process published
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fixture, kwargs, seed=None):
+        ''' Copy of fixture(**kwargs), built only if it isn't cached yet '''
+        key = (fixture, tuple(sorted(kwargs.items())), seed)
+        entry = self.entries.get(key)
+        if entry is not None and entry[2] and not os.path.exists(entry[0]):  # cleaned up by the publishing process
+            del self.entries[key]
+            self.n_bytes -= entry[1]
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            self.add(key, *self.build(key, fixture, kwargs))
+        value, _, published = self.entries[key]
+        return np.load(value, mmap_mode='c') if published else self.hand_out(value)
+
+    def build(self, key, fixture, kwargs):
+        '''
+        Output of the fixture. When sharing, arrays are published and their path returned instead, a file another
+        process already published for key is used without calling the fixture
+        :return: (value or path, published)
+        '''
+        if not self.shared:
+            return fixture(**kwargs), False
+        path = self.path(fixture, key[1:])
+        if not os.path.exists(path):
+            value = fixture(**kwargs)
+            if not isinstance(value, np.ndarray) or value.dtype == object:
+                return value, False
+            # Written under a temporary name and renamed so other processes never see a partial file
+            tmp_path = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp_path, mode='wb') as out_file:
+                np.save(out_file, value)
+            os.replace(tmp_path, path)
+            self.written.add(path)
+        return path, True
+
+    @staticmethod
+    def hand_out(value):
+        ''' Fresh copy of a cached value for a single run '''
+        if isinstance(value, np.ndarray):
+            return value.copy()
+        elif isinstance(value, list):
+            return list(value)
+        elif isinstance(value, (tuple, str, bytes, int, float, complex, bool, type(None))):
+            return value
+        return copy.deepcopy(value)
+
+    def add(self, key, value, published):
+        size = os.path.getsize(value) if published else nbytes(value)
+        self.entries[key] = (value, size, published)
+        self.n_bytes += size
+        # Evict least recently used entries, always keeping the newest one
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.n_bytes > self.max_bytes):
+            _, (evicted, evicted_size, published) = self.entries.popitem(last=False)
+            self.n_bytes -= evicted_size
+            # Runs still mapping the file keep reading it, deleting it only unlinks its name
+            if published and evicted in self.written:
+                self.written.discard(evicted)
+                _remove(evicted)
+
+    def path(self, fixture, key):
+        ''' File a fixture output is published to, key being the (kwargs, seed) of the output '''
+        digest = hashlib.sha256(repr((fixture_id(fixture), key)).encode()).hexdigest()
+        return os.path.join(shared_dir(), '%s_%s.npy' % (self.namespace, digest))
+
+    def cleanup(self):
+        ''' Delete the files published under this cache's namespace and forget the entries pointing to them '''
+        for key, (_, size, published) in list(self.entries.items()):
+            if published:
+                del self.entries[key]
+                self.n_bytes -= size
+        self.written.clear()
+        _remove_namespace(self.namespace)
+
+
+def _remove_namespace(namespace, pid=None):
+    ''' Delete the files published under namespace, only from process pid when given '''
+    if pid is not None and pid != os.getpid():
+        return
+    for path in glob.glob(os.path.join(shared_dir(), '%s_*.npy' % namespace)):
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # removed by another process already
+        pass
@@ -1,22 +1,32 @@
 import platform
 import sys
+import os
+import importlib
+import multiprocessing
+import contextvars
+import gc
+import threading
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import psutil
-from memory_profiler import profile as mprofile
-from line_profiler import LineProfiler
+try:
+    import resource
+except ImportError:  # Windows, page faults aren't recorded there
+    resource = None
 import inspect
-import io
-from contextlib import redirect_stdout
-import itertools
+import copy
+from contextlib import redirect_stdout, contextmanager
+import numpy as np
 import random
 import time
-from functools import wraps, update_wrapper, partial
+from functools import wraps, partial
 import datetime
 import json
-from pprint import pprint
-from collections import defaultdict
-import pandas as pd
-import seaborn as sns
-import copy
+from jungle.utils.runstore import RunStore
+from jungle.utils.analysis import grouped_mean_ci, fit_scaling, fit_drift
+from jungle.utils.designs import DESIGNS, TestSequence
+from jungle.utils.capture import CaptureStream, check_policy
+from jungle.utils.fixtures import FixtureCache
 
 
 class DelayedDecorator(object):
@@ -121,41 +131,54 @@ def get_class_that_defined_method(meth):
 
 class JungleEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, JungleExperiment):
+        if isinstance(obj, ExperimentResult):
+            return {'function': obj.func_name, 'runs': len(obj.runs)}
+        elif isinstance(obj, JungleExperiment):
             return 'Placeholder for serialized Jungle Controller'
         else:
             return super(JungleEncoder, self).default(obj)
 
 
-class persistent_locals(object):
+# Run dict of the JungleExperiment cell currently executing, JungleProfiler results are registered into it
+_active_run = contextvars.ContextVar('jungle_active_run', default=None)
 
-    def __init__(self, func):
-        self._locals = {}
-        update_wrapper(self, func)
-        self.func = func
 
-    def __call__(self, *args, **kwargs):
+# (RunSink, partition, extra columns) that JungleExperiment runs recorded in this context are streamed to
+_active_sink = contextvars.ContextVar('jungle_active_sink', default=None)
 
-        def tracer(frame, event, arg):
-            if event == 'return':
-                self._locals = frame.f_locals.copy()
 
-        # tracer is activated on next call, return or exception
-        sys.setprofile(tracer)
-        try:
-            # trace the function call
-            f = self.func(*args, **kwargs)
-        finally:
-            # disable tracer and replace with old one
-            sys.setprofile(None)
-        return f
+@contextmanager
+def stream_runs_to(sink, partition, **meta):
+    ''' Append every JungleExperiment run recorded inside the with block to partition of sink, along with meta '''
+    token = _active_sink.set((sink, partition, meta))
+    try:
+        yield sink
+    finally:
+        _active_sink.reset(token)
 
-    def clear_locals(self):
-        self._locals = {}
 
-    @property
-    def locals(self):
-        return self._locals
+@contextmanager
+def gc_mode_of(gc_mode):
+    ''' Disable or enable the garbage collector according to a JungleExperiment gc_mode, restoring it on exit '''
+    was_enabled = gc.isenabled()
+    if gc_mode == 'disable':
+        gc.disable()
+    elif gc_mode == 'enable':
+        gc.enable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+        else:
+            gc.disable()
+
+
+def register_profile(profile):
+    ''' Attach a JungleProfiler result to the JungleExperiment run active in this context, if there is one '''
+    run = _active_run.get()
+    if run is not None:
+        run['profile'] = profile
 
 
 def delayinit(cls):
@@ -177,30 +200,131 @@ def delayinit(cls):
     return construct
 
 
+def get_platform_specs():
+    return 'Machine: %s\n' \
+           'Version: %s\n' \
+           'Platform: %s\n' \
+           'Processor: %s' % (platform.machine(),
+                              platform.version(),
+                              platform.platform(),
+                              platform.processor())
+
+
+def get_python_version():
+    return '%d.%d.%d\nRelease lvl: %s\nSerial #:%d' % sys.version_info
+
+
+def runs_frame(runs):
+    ''' pandas view of a run store, with datetime columns derived from the recorded seconds '''
+    controller_df = runs.to_frame()
+    for key in ('start', 'stop'):
+        if '%s_seconds' % key in controller_df:
+            controller_df['%s_datetime' % key] = [str(datetime.datetime.fromtimestamp(sec))
+                                                  for sec in controller_df['%s_seconds' % key]]
+    return controller_df
+
+
+def line_frame(rows):
+    ''' pandas table of line timing rows, see JungleExperiment.aggregate_line_stats '''
+    import pandas as pd
+
+    if not rows:
+        return pd.DataFrame(columns=JungleProfiler.line_columns)
+    return pd.DataFrame(rows)
+
+
 class JungleExperiment(object):
     """ Decorator Class for """
 
-    def __init__(self, reps=2, comb=True, tlim=5, **kwargs):
+    # System counters of every run recorded as columns of controller_df, in this order, deltas over the run except for
+    # load_1m (the 1 minute load average at its end) and system_cpu_pct (system wide cpu utilization during it).
+    # Counters the platform doesn't support are left out
+    counter_columns = ('cpu_user', 'cpu_system', 'ctx_voluntary', 'ctx_involuntary', 'minor_faults', 'major_faults',
+                       'read_bytes', 'write_bytes', 'load_1m', 'system_cpu_pct')
+
+    def __init__(self, reps=2, comb=True, tlim=5, workers=None, executor=None, max_concurrency=None, cpus=None,
+                 schedule='fixed', rel_err=0.05, confidence=0.95, max_reps=None, design=None, budget=None, seed=None,
+                 warmup=0, warmup_cv=0.05, max_warmup=50, gc_mode=None, sequence_seed=None, resume_from=0,
+                 fixtures=None, fixture_entries=32, fixture_bytes=2 ** 28, shared_fixtures=False, **kwargs):
         '''
         Decorator class for standardized profiling and reporting
         Called before decorated function is read
-        :param reps:
+        :param reps: reps of every cell, or the initial reps of every cell with the adaptive schedule
+        :param comb: run every combination of kwargs when no design is given, otherwise a Latin hypercube
+        :param tlim: seconds the adaptive schedule may spend on a call
+        :param schedule: 'fixed' runs reps of every cell, 'adaptive' keeps adding reps to cells whose walltime
+            confidence interval is wider than rel_err of the mean until tlim runs out
+        :param rel_err: target confidence interval half width relative to the mean for the adaptive schedule
+        :param confidence: confidence level of the adaptive schedule's intervals
+        :param max_reps: cap on the reps of any one cell with the adaptive schedule
+        :param workers: number of worker processes the test sequence is fanned out to, None runs serially
+        :param executor: existing concurrent.futures Executor to use instead of creating a process pool
+        :param max_concurrency: max number of runs in flight at once, defaults to the number of workers
+        :param cpus: list of cpu ids to pin workers to (one per worker), True to use every cpu available. When running
+            serially the calling process is pinned to the whole list for the duration of the call
+        :param warmup: number of discarded calls of the first cell made before the runs, or 'auto' to call it until the
+            coefficient of variation of the last 5 walltimes is under warmup_cv (at most max_warmup calls). Every
+            worker process warms up before its first run
+        :param gc_mode: None leaves the garbage collector alone, 'collect' collects before every run, 'disable' or
+            'enable' disables or enables it for the duration of every run
+        :param sequence_seed: seed of the order runs are made in, drawn from seed when None. Recorded so an
+            interrupted sweep can be resumed in the same order
+        :param resume_from: position in the test sequence to start running from, skipping the runs before it
+        :param fixtures: dict of kwarg name -> fixture function building that input of the decorated function, outside
+            of the run's timing. Fixture arguments are taken by name from the cell's kwargs, then from the decorated
+            function's defaults (e.g. seed). Outputs are memoized by (fixture, kwargs, seed) in a FixtureCache of at
+            most fixture_entries entries and fixture_bytes bytes, and every run gets its own copy
+        :param shared_fixtures: publish array fixtures to shared memory, which worker processes map copy-on-write
+            instead of building their own
         '''
         print('%s.__init__ called' % self.__class__.__name__)
         self.kwargs = kwargs  # These will be used to generate testing
         self.reps = reps
         self.comb = comb
         self.tlim = tlim
-        self.run_dict = {}
-
-        self.platform_specs = 'Machine: %s\n' \
-                              'Version: %s\n' \
-                              'Platform: %s\n' \
-                              'Processor: %s' % (platform.machine(),
-                                                 platform.version(),
-                                                 platform.platform(),
-                                                 platform.processor())
-        self.python_version = '%d.%d.%d\nRelease lvl: %s\nSerial #:%d' % sys.version_info
+        self.workers = workers
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.cpus = cpus
+        if schedule not in ('fixed', 'adaptive'):
+            raise ValueError('schedule: %s provided to JungleExperiment should be \'fixed\' or \'adaptive\'' % schedule)
+        if schedule == 'adaptive' and reps < 2:
+            raise ValueError('The adaptive schedule needs at least 2 reps to estimate a confidence interval')
+        self.schedule = schedule
+        self.rel_err = rel_err
+        self.confidence = confidence
+        self.max_reps = max_reps
+        if design is None:
+            design = 'full' if comb else 'lhs'
+        if design not in DESIGNS:
+            raise ValueError('design: %s provided to JungleExperiment should be one of %s' % (design, sorted(DESIGNS)))
+        self.design = design
+        self.budget = budget
+        self.seed = seed
+        if warmup != 'auto' and not (isinstance(warmup, int) and warmup >= 0):
+            raise ValueError('warmup: %s provided to JungleExperiment should be a number of calls or \'auto\'' % warmup)
+        self.warmup = warmup
+        self.warmup_cv = warmup_cv
+        self.max_warmup = max_warmup
+        if gc_mode not in (None, 'collect', 'disable', 'enable'):
+            raise ValueError('gc_mode: %s provided to JungleExperiment should be None, \'collect\', \'disable\' or '
+                             '\'enable\'' % gc_mode)
+        self.gc_mode = gc_mode
+        if resume_from and schedule == 'adaptive':
+            raise ValueError('The adaptive schedule can\'t resume from a position in the test sequence')
+        self.sequence_seed = sequence_seed
+        self.resume_from = resume_from
+        self.first_index = 0  # test sequence position of the first row of the run store
+        self.fixtures = fixtures or {}
+        self.fixture_cache = FixtureCache(fixture_entries, fixture_bytes, shared_fixtures)
+        self.environment = {}
+        self.rng = random.Random(seed)
+        self.runs = RunStore(0)
+        self.line_totals = {}
+        self.line_rows = []
+
+        self.platform_specs = get_platform_specs()
+        self.python_version = get_python_version()
         self.vm = psutil.virtual_memory()
         self.cpu = psutil.cpu_stats()
 
@@ -213,68 +337,287 @@ class JungleExperiment(object):
         self.f_docs = f.__doc__
         self.func_name = f.__name__
 
-        # Modify f to pick up JungleProfiler instance even if it isn't returned explicitly
-        f = persistent_locals(f)
+        self.func_module = f.__module__
+        self.func_qualname = f.__qualname__
+
         # Generate randomized test sequence
         self.test_seq = self.make_test_sequence()
 
         @wraps(f)
         def junglecontroller_wrapped_f(*args):
             ''' Called when decorated function is called '''
-            for i, kwarg_dict in enumerate(self.test_seq):
-                try:
-                    repnum = kwarg_dict['rep']
-                except KeyError as ke:  # think there is an issue here
-                    repnum = 'na'
-                    pass
-
-                kwarg_dict.pop('rep', None)
-                run = {
-                    'kwargs': kwarg_dict,
-                    'start_seconds': time.time(),
-                    'stdout': None,
-                    'error': None,
-                    'profile': None,
-                    'rep': repnum
-                }
-
-                try:
-                    # Call the decorated function with the kwarg_dict provided by JungleExperiment
-                    f(*args, **kwarg_dict)
-
-                    # Collect JungleProfile Instances
-                    for local in f.locals:
-                        obj = f.locals[local]
-                        if isinstance(obj, JungleProfiler):
-                            run['profile'] = obj
-                            break
-                        else:
-                            try:
-                                for item in obj:
-                                    if isinstance(item, JungleProfiler):
-                                        run['profile'] = item
-                                        break
-                            except TypeError:
-                                pass
-
-                    # End memory and time profiling
-                except Exception as e:
-                    run['error'] = e
-                    raise e
-                run['stop_seconds'] = time.time()
-
-                # Get Date Time formatted objs
-                run['start_datetime'] = str(datetime.datetime.fromtimestamp(run['start_seconds']))
-                run['stop_datetime'] = str(datetime.datetime.fromtimestamp(run['stop_seconds']))
-                run['controller walltime'] = run['stop_seconds'] - run['start_seconds']
-
-                self.run_dict[i] = run
+            # The store grows as needed, so huge sequences don't preallocate every run up front
+            self.runs = RunStore(min(len(self.test_seq) - self.resume_from, 2 ** 16))
+            self.line_totals = {}
+            executor = self.executor
+            if executor is None and self.workers is not None:
+                executor = self.make_executor()
+            affinity = None
+            try:
+                if executor is None:
+                    affinity = self.pin_process()
+                    warmup_calls = self.warm_up(f, args)
+                else:
+                    warmup_calls = 'per worker' if self.warmup else 0
+                # Memory and cpu stats as of this call, per run counters are recorded in the runs themselves
+                self.vm = psutil.virtual_memory()
+                self.cpu = psutil.cpu_stats()
+                self.environment = self.get_environment(warmup_calls)
+                if self.schedule == 'adaptive':
+                    self.first_index = 0
+                    self.run_adaptive(f, args, executor)
+                else:
+                    self.first_index = self.resume_from
+                    self.run_sequence(f, args, enumerate(self.test_seq.iter_from(self.resume_from), self.resume_from),
+                                      executor)
+            finally:
+                if affinity is not None:
+                    psutil.Process().cpu_affinity(affinity)
+                if executor is not self.executor:
+                    executor.shutdown()
             self.postprocess_runs()
-            return copy.deepcopy(self)
+            return ExperimentResult(self, self.runs, self.line_rows, **self.call_snapshot())
 
+        # Let worker processes find this experiment and the function it wraps
+        junglecontroller_wrapped_f.jungle_experiment = self
+        junglecontroller_wrapped_f.jungle_func = f
         return junglecontroller_wrapped_f
 
+    def run_cell(self, f, args, kwarg_dict):
+        ''' Call f once with the kwargs of a single test sequence cell and return the run dict '''
+        kwarg_dict = dict(kwarg_dict)  # leave the test sequence untouched for later calls
+        repnum = kwarg_dict.pop('rep', 'na')
+        fixture_t0 = time.perf_counter_ns()
+        call_kwargs = dict(kwarg_dict, **self.fixture_kwargs(f, kwarg_dict))
+        fixture_ns = time.perf_counter_ns() - fixture_t0
+        if self.gc_mode == 'collect':
+            gc.collect()
+        run = {
+            'kwargs': kwarg_dict,
+            'start_seconds': time.time(),
+            'error': None,
+            'profile': None,
+            'rep': repnum,
+            'fixture_ns': fixture_ns
+        }
+
+        # JungleProfilers called by f register their results with this run, even if they aren't returned explicitly
+        token = _active_run.set(run)
+        try:
+            # Call the decorated function with the kwarg_dict provided by JungleExperiment
+            with gc_mode_of(self.gc_mode):
+                counters = _process_counters()
+                psutil.cpu_percent()
+                f(*args, **call_kwargs)
+                system_cpu_pct = psutil.cpu_percent()
+                end_counters = _process_counters()
+        except Exception as e:
+            run['error'] = e
+            raise e
+        finally:
+            _active_run.reset(token)
+        run['stop_seconds'] = time.time()
+        run['counters'] = {key: end_counters[key] - val for key, val in counters.items()}
+        run['counters']['system_cpu_pct'] = system_cpu_pct
+        if hasattr(os, 'getloadavg'):
+            run['counters']['load_1m'] = os.getloadavg()[0]
+        run['controller walltime'] = run['stop_seconds'] - run['start_seconds']
+        return run
+
+    def record_run(self, i, run):
+        ''' Flatten run dict i into a row of the run store and fold its line timings into the line totals '''
+        profile = run['profile']
+        row = {'index': i}
+        for arg, val in run['kwargs'].items():
+            row['kwarg: %s' % arg] = val
+        for key in ('rep', 'start_seconds', 'stop_seconds', 'controller walltime', 'fixture_ns'):
+            row[key] = run[key]
+        counters = run.get('counters', {})
+        row.update((name, counters[name]) for name in self.counter_columns if name in counters)
+        if profile is not None:
+            for column in JungleProfiler.columns:
+                row[column] = getattr(profile, column, None)
+            row['stdout'] = profile.stdout
+        self.runs.write(i - self.first_index, row)
+
+        active_sink = _active_sink.get()
+        if active_sink is not None:
+            sink, partition, meta = active_sink
+            sink.append(partition, dict(meta, **row))
+
+        cell = tuple(sorted(run['kwargs'].items()))
+        for file, function, line, hits, total_ns, _ in getattr(profile, 'line_stats', None) or []:
+            totals = self.line_totals.setdefault((cell, file, function, line), [0, 0, 0.])
+            totals[0] += 1
+            totals[1] += hits
+            totals[2] += total_ns
+
+    def run_sequence(self, f, args, indexed_seq, executor=None, deadline=None):
+        '''
+        Run and record every (index, kwarg_dict) of indexed_seq, serially or on executor
+        :param deadline: time.time() after which no more runs are started
+        '''
+        if executor is None:
+            for i, kwarg_dict in indexed_seq:
+                if deadline is not None and time.time() > deadline:
+                    break
+                self.record_run(i, self.run_cell(f, args, kwarg_dict))
+            return
+
+        if '<locals>' in self.func_qualname:
+            raise ValueError('JungleExperiment can only run %s in parallel if it is defined at module or class level'
+                             % self.func_qualname)
+        max_concurrency = self.max_concurrency or self.workers or getattr(executor, '_max_workers', None) \
+            or os.cpu_count()
+
+        futures = {}
+        for i, kwarg_dict in indexed_seq:
+            if deadline is not None and time.time() > deadline:
+                break
+            # Only keep max_concurrency runs in flight so they don't contend for the same cores
+            if len(futures) >= max_concurrency:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.record_run(futures.pop(future), future.result())
+            future = executor.submit(_run_cell_in_worker, self.func_module, self.func_qualname, args, kwarg_dict,
+                                     self.fixture_cache.namespace)
+            futures[future] = i
+        for future in wait(futures).done:
+            self.record_run(futures[future], future.result())
+
+    def run_adaptive(self, f, args, executor=None):
+        ''' Add reps to the cells whose walltime confidence interval is still wider than rel_err until tlim runs out '''
+        deadline = time.time() + self.tlim
+        cells = list(self.design_cells())
+        cell_reps = [0] * len(cells)
+        row_cells = []  # cell index of every recorded row
+
+        noisy = list(range(len(cells)))  # cells whose interval is still wider than rel_err
+        batch = [c for c in noisy for _ in range(self.reps)]
+        while batch and time.time() < deadline:
+            # Shuffle to mitigate temporal confounding factors
+            self.rng.shuffle(batch)
+            indexed_seq = []
+            for c in batch:
+                indexed_seq.append((len(row_cells), dict(cells[c], rep=cell_reps[c])))
+                row_cells.append(c)
+                cell_reps[c] += 1
+            self.run_sequence(f, args, indexed_seq, executor, deadline)
+            del row_cells[len(self.runs):]  # runs skipped by the deadline
+
+            metric = 'walltime' if 'walltime' in self.runs.columns else 'controller walltime'
+            means, half_widths = grouped_mean_ci(self.runs.columns[metric][:len(row_cells)], row_cells, len(cells),
+                                                 self.confidence)
+            noisy = list(np.flatnonzero(half_widths > self.rel_err * np.abs(means)))
+            # Noisy cells get another rep unless they reached max_reps
+            batch = [c for c in noisy if self.max_reps is None or cell_reps[c] < self.max_reps]
+
+        capped = sum(1 for c in noisy if self.max_reps is not None and cell_reps[c] >= self.max_reps)
+        print('Adaptive schedule: %d runs over %d cells, %d cells short of rel_err %s (%d of them at max_reps)'
+              % (len(row_cells), len(cells), len(noisy), self.rel_err, capped))
+
+    def warm_up(self, f, args):
+        '''
+        Make the discarded warmup calls of the first cell of the test sequence, outside of any recorded run
+        :return: number of calls made
+        '''
+        if not self.warmup or not len(self.test_seq):
+            return 0
+        kwarg_dict = dict(self.test_seq[0])
+        kwarg_dict.pop('rep', None)
+        kwarg_dict.update(self.fixture_kwargs(f, kwarg_dict))
+        calls = self.max_warmup if self.warmup == 'auto' else self.warmup
+        walltimes = []
+        with redirect_stdout(CaptureStream('discard')), gc_mode_of(self.gc_mode):
+            for _ in range(calls):
+                token = _active_run.set({})  # JungleProfilers register with a throwaway run
+                t0 = time.perf_counter()
+                try:
+                    f(*args, **kwarg_dict)
+                finally:
+                    _active_run.reset(token)
+                walltimes.append(time.perf_counter() - t0)
+                if self.warmup == 'auto' and len(walltimes) >= 5:
+                    recent = np.array(walltimes[-5:])
+                    if recent.std(ddof=1) <= self.warmup_cv * recent.mean():
+                        break
+        return len(walltimes)
+
+    def fixture_kwargs(self, f, kwarg_dict):
+        ''' Copies of the fixture outputs of a cell, by kwarg name, see fixtures in __init__ '''
+        if not self.fixtures:
+            return {}
+        defaults = {name: param.default for name, param in inspect.signature(f).parameters.items()
+                    if param.default is not param.empty}
+        values = {}
+        for name, fixture in self.fixtures.items():
+            fixture_kwargs = {}
+            for arg in inspect.signature(fixture).parameters:
+                if arg in kwarg_dict:
+                    fixture_kwargs[arg] = kwarg_dict[arg]
+                elif arg in defaults:
+                    fixture_kwargs[arg] = defaults[arg]
+            values[name] = self.fixture_cache.get(fixture, fixture_kwargs, self.seed)
+        return values
+
+    def pin_process(self):
+        '''
+        Pin the calling process to self.cpus for a serial call
+        :return: the previous cpu affinity to restore afterwards, None if the process wasn't pinned
+        '''
+        if not self.cpus or self.cpus is True or not hasattr(psutil.Process, 'cpu_affinity'):
+            return None
+        process = psutil.Process()
+        affinity = process.cpu_affinity()
+        process.cpu_affinity(list(self.cpus))
+        return affinity
+
+    def get_environment(self, warmup_calls):
+        ''' Snapshot of the conditions the runs of a call are made in '''
+        environment = {
+            'warmup': self.warmup,
+            'warmup_calls': warmup_calls,
+            'gc_mode': self.gc_mode,
+            'gc_enabled': gc.isenabled(),
+            'gc_threshold': gc.get_threshold(),
+            'cpu_affinity': psutil.Process().cpu_affinity() if hasattr(psutil.Process, 'cpu_affinity') else None,
+            'worker_cpus': (self.cpus if self.cpus is True else list(self.cpus)) if self.cpus and self.workers else None,
+        }
+        cpu_freq = psutil.cpu_freq() if hasattr(psutil, 'cpu_freq') else None
+        environment['cpu_freq_mhz'] = cpu_freq.current if cpu_freq else None
+        environment['load_avg'] = os.getloadavg() if hasattr(os, 'getloadavg') else None
+        return environment
+
+    def make_executor(self):
+        ''' Create a process pool of self.workers processes, optionally pinning each one to its own cpu '''
+        if not self.cpus:
+            return ProcessPoolExecutor(max_workers=self.workers)
+
+        if not hasattr(psutil.Process, 'cpu_affinity'):
+            print('CPU pinning is not supported on this platform, workers will not be pinned')
+            return ProcessPoolExecutor(max_workers=self.workers)
+
+        cpus = psutil.Process().cpu_affinity() if self.cpus is True else list(self.cpus)
+        workers = self.workers or len(cpus)
+        cpu_queue = multiprocessing.Queue()
+        for i in range(workers):
+            cpu_queue.put(cpus[i % len(cpus)])
+        return ProcessPoolExecutor(max_workers=workers, initializer=_pin_worker, initargs=(cpu_queue,))
+
+    def __getstate__(self):
+        # A user supplied executor can't be pickled along with results, nor are cached fixtures worth pickling
+        state = self.__dict__.copy()
+        state['executor'] = None
+        cache = state.get('fixture_cache')
+        if cache is not None:
+            state['fixture_cache'] = FixtureCache(cache.max_entries, cache.max_bytes, cache.shared, cache.namespace)
+        return state
+
     def __str__(self):
+        return self.describe(self.runs)
+
+    def describe(self, runs):
+        ''' Metadata of the experiment and every row of runs as text '''
         s = 'JungleProfiler'
         s += '\n\nPython Version: %s' % self.python_version
         s += '\n\nMachine Specs:\n%s' % self.platform_specs
@@ -282,62 +625,102 @@ class JungleExperiment(object):
         s += '\n\nSource Code:\n%s' % self.source_code
         s += '\n\nDocumentation:\n%s' % self.f_docs
         s += '\n\nRuns:'
-        for (k, v) in self.run_dict.items():
-            s += '\n\t%d: %s' % (k, v)
+        for i in range(len(runs)):
+            s += '\n\t%d: %s' % (i, runs.row(i))
         # s += '\n\nCaptured StdOut:\n%s' % self.f_stdout
         # todo timing
         # todo memory
         return s
 
-    def make_test_sequence(self):
-        '''
-        Convert kwargs into
-        :return: iterable of kwargs dicts
-        '''
+    def design_budget(self):
+        ''' Check kwargs can be run and return the number of cells asked of the design '''
         # Make sure rep arg isn't in kwargs
         if 'rep' in self.kwargs:
             raise ValueError('JungleProfiler received a kwarg named \'rep\'.'
                              ' This arg is used by JungleProfiler already. ')
-        else:
-            self.kwargs['rep'] = list(range(self.reps))
         # Make sure each arg in kwargs is a list
         for arg in self.kwargs:
             if not isinstance(self.kwargs[arg], list):
                 raise ValueError('kwarg: %s provided to JungleProfiler is of'
                                  ' type %s and should be a list' % (arg, type(self.kwargs[arg])))
+        return self.budget or max([len(levels) for levels in self.kwargs.values()] + [1])
 
-        # All Combinations
-        arg_names = sorted(self.kwargs)
-        test_tuples = itertools.product(*(self.kwargs[arg] for arg in arg_names))
-        test_seq = [{arg_names[i]: val for i, val in enumerate(tt)} for tt in test_tuples]
-        # todo add alternatives to all combinations
+    def design_cells(self):
+        ''' Lazily generate the kwarg dicts of the cells picked by the design, without reps '''
+        return DESIGNS[self.design](self.kwargs, self.design_budget(), self.rng)
 
-        # Shuffle to mitigate temporal confounding factors
-        random.shuffle(test_seq)
-        return test_seq
+    def make_test_sequence(self):
+        '''
+        Lazy sequence of the kwarg dicts, rep included, of every run in a seeded pseudo-random order
+        Shuffled to mitigate temporal confounding factors
+        :return: TestSequence
+        '''
+        if self.sequence_seed is None:
+            self.sequence_seed = self.rng.getrandbits(64)
+        return TestSequence(self.kwargs, self.design, self.design_budget(), self.reps, self.sequence_seed)
 
     def postprocess_runs(self):
-        ''' Convert Run Dict into pandas df'''
-        self.controller_dict = defaultdict(list)
-        for key, rd in self.run_dict.items():
-            self.controller_dict['index'].append(key)
-            for rd_key, x in rd.items():
-                if rd_key == 'profile':
-                    self.controller_dict['profile'].append('Coming to Jungle Soon!')
-                    self.controller_dict['walltime'].append(x.walltime)
-                elif rd_key == 'kwargs':
-                    assert isinstance(x, dict)
-                    for arg, val in x.items():
-                        self.controller_dict['kwarg: %s' % arg].append(val)
-                else:
-                    self.controller_dict[rd_key].append(x)
+        ''' Build the line timing table once every run has been recorded '''
+        self.line_rows = self.aggregate_line_stats()
 
-        self.controller_df = pd.DataFrame(self.controller_dict)
-        self.controller_df.set_index('index')
+    @property
+    def line_df(self):
+        ''' pandas table of the line timings of the latest call '''
+        return line_frame(self.line_rows)
 
-    def analyze_rundict(self):
-        # todo test for statistical trends in data, including run order
-        pass
+    @property
+    def controller_df(self):
+        ''' pandas view of the runs of the latest call '''
+        return runs_frame(self.runs)
+
+    def aggregate_line_stats(self):
+        '''
+        Line timings of every run's JungleProfiler, summed across reps of the same kwargs
+        :return: list of row dicts, slowest lines first
+        '''
+        rows = []
+        for (cell, file, function, line), (reps, hits, total_ns) in self.line_totals.items():
+            row = {'kwarg: %s' % arg: val for arg, val in cell}
+            row.update(file=file, function=function, line=line, reps=reps, hits=hits, total_ns=total_ns,
+                       per_hit_ns=total_ns / hits)
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['total_ns'], reverse=True)
+
+    def analyze_rundict(self, x='kwarg: n', y=None, runs=None, correct_drift=False):
+        '''
+        Statistical analysis of the runs of the latest call, or of the runs given
+        :param x: column of the problem size that scaling laws are fit against
+        :param y: timing column, defaults to walltime when runs were profiled and controller walltime otherwise
+        :param correct_drift: also return y with the start time drift taken out, the runs themselves are left as they are
+        :return: dict of analysis name -> result. 'scaling' holds the fit_scaling result when runs have an x column,
+        'drift' the fit_drift results of y against 'run index' and 'start time' with the kwarg cells as covariates, and
+        with correct_drift 'drift corrected' the float array of corrected y by row (y itself when no drift could be fit)
+        '''
+        runs = self.runs if runs is None else runs
+        if y is None:
+            y = 'walltime' if 'walltime' in runs.columns else 'controller walltime'
+        analysis = {}
+        if y not in runs.columns:
+            return analysis
+        n = len(runs)
+        values = runs.columns[y][:n]
+        if x in runs.columns:
+            analysis['scaling'] = fit_scaling(runs.columns[x][:n], values)
+
+        # Runs are shuffled across cells, so a trend in run order or time within cells is drift, not a kwarg effect
+        kwarg_cols = sorted(col for col in runs.columns if col.startswith('kwarg: '))
+        cell_ids = {}
+        groups = np.array([cell_ids.setdefault(tuple(repr(runs.columns[col][i]) for col in kwarg_cols), len(cell_ids))
+                           for i in range(n)], dtype=np.int64)
+        start = runs.columns['start_seconds'][:n] - np.nanmin(runs.columns['start_seconds'][:n])
+        analysis['drift'] = {'run index': fit_drift(values, runs.columns['index'][:n], groups, len(cell_ids)),
+                             'start time': fit_drift(values, start, groups, len(cell_ids))}
+
+        time_drift = analysis['drift']['start time']
+        if correct_drift:
+            slope = 0. if np.isnan(time_drift['slope']) else time_drift['slope']
+            analysis['drift corrected'] = np.asarray(values, dtype=np.float64) - slope * (start - np.nanmean(start))
+        return analysis
 
     def plot(self, path):
         '''
@@ -347,23 +730,271 @@ class JungleExperiment(object):
         '''
         pass
 
-    def dump_(self, path):
-        '''
+    # Attributes that change with every call, copied into the ExperimentResult of each call
+    call_attributes = ('vm', 'cpu', 'environment', 'sequence_seed', 'resume_from', 'first_index')
+
+    def call_snapshot(self):
+        ''' Copies of the call_attributes as of the latest call '''
+        return {attr: copy.deepcopy(getattr(self, attr, None)) for attr in self.call_attributes}
 
+    # Attributes written to the header of a dumped experiment
+    dumped_attributes = ('func_name', 'func_module', 'func_qualname', 'source_file', 'source_code', 'f_docs',
+                         'platform_specs', 'python_version', 'kwargs', 'reps', 'comb', 'tlim', 'schedule', 'rel_err',
+                         'confidence', 'max_reps', 'design', 'budget', 'seed', 'warmup', 'gc_mode', 'environment',
+                         'sequence_seed', 'resume_from', 'first_index')
+
+    def dump_(self, path, runs=None, line_rows=None, snapshot=None):
+        '''
+        Write the runs of the latest call, or the runs given, and the experiment's metadata to a binary file that
+        JungleExperiment.load memory-maps
         :param path:
+        :param snapshot: call_snapshot of the call the runs come from, overriding the experiment's latest values
         :return:
         '''
-        pass
+        runs = self.runs if runs is None else runs
+        line_rows = getattr(self, 'line_rows', None) if line_rows is None else line_rows
+        metadata = {attr: getattr(self, attr, None) for attr in self.dumped_attributes}
+        metadata.update({attr: val for attr, val in (snapshot or {}).items() if attr in self.dumped_attributes})
+        metadata['line_df'] = line_rows or []
+        runs.dump(path, metadata)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Load a file written by dump_, numeric run columns are memory-mapped rather than read into memory
+        :return: ExperimentResult
+        '''
+        runs, metadata = RunStore.load(path)
+        experiment = cls.__new__(cls)
+        experiment.__dict__.update({attr: metadata.get(attr) for attr in cls.dumped_attributes})
+        experiment.workers = experiment.executor = experiment.max_concurrency = experiment.cpus = None
+        experiment.rng = random.Random(experiment.seed)
+        experiment.runs = runs
+        experiment.line_totals = {}
+        experiment.line_rows = metadata['line_df']
+        experiment.vm = experiment.cpu = None
+        return ExperimentResult(experiment, runs, experiment.line_rows, **experiment.call_snapshot())
+
+
+def _pin_worker(cpu_queue):
+    ''' Process pool initializer that pins the worker process to the next free cpu '''
+    psutil.Process().cpu_affinity([cpu_queue.get()])
+
+
+_process = None
+
+
+def _this_process():
+    ''' psutil handle of the current process, recreated in forked children '''
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process
+
+
+def _process_counters():
+    ''' Cumulative cpu time, context switch, page fault and I/O counters of the current process, read in one go '''
+    process = _this_process()
+    with process.oneshot():
+        cpu = process.cpu_times()
+        ctx = process.num_ctx_switches()
+        counters = {'cpu_user': cpu.user, 'cpu_system': cpu.system,
+                    'ctx_voluntary': ctx.voluntary, 'ctx_involuntary': ctx.involuntary}
+        if hasattr(process, 'io_counters'):  # not on macOS
+            try:
+                io_counters = process.io_counters()
+                counters['read_bytes'], counters['write_bytes'] = io_counters.read_bytes, io_counters.write_bytes
+            except psutil.AccessDenied:
+                pass
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        counters['minor_faults'], counters['major_faults'] = usage.ru_minflt, usage.ru_majflt
+    return counters
+
+
+_warmed_up = set()  # (module, qualname) of the functions this process made its warmup calls of
+
+
+def _run_cell_in_worker(func_module, func_qualname, args, kwarg_dict, fixture_namespace):
+    '''
+    Look up the JungleExperiment decorated function by name and run a single cell of it, warming up first
+    :param fixture_namespace: namespace of the FixtureCache of the process submitting the cell, to find its shared files
+    '''
+    obj = importlib.import_module(func_module)
+    for attr in func_qualname.split('.'):
+        obj = getattr(obj, attr)
+    obj.jungle_experiment.fixture_cache.namespace = fixture_namespace
+    if (func_module, func_qualname) not in _warmed_up:
+        _warmed_up.add((func_module, func_qualname))
+        obj.jungle_experiment.warm_up(obj.jungle_func, args)
+    return obj.jungle_experiment.run_cell(obj.jungle_func, args, kwarg_dict)
+
+
+def _noop():
+    pass
+
+
+def _time_loops(f, args, kwargs, loops):
+    ''' Call f loops times and return its last return value with the perf, process and thread clock deltas in ns '''
+    p0 = time.process_time_ns()
+    th0 = time.thread_time_ns()
+    t0 = time.perf_counter_ns()
+    for _ in range(loops):
+        preturn = f(*args, **kwargs)
+    t1 = time.perf_counter_ns()
+    th1 = time.thread_time_ns()
+    p1 = time.process_time_ns()
+    return preturn, t1 - t0, p1 - p0, th1 - th0
+
+
+def _copy_inputs(args, kwargs):
+    '''
+    Copies of the arrays and mutable containers among args and kwargs, other objects are passed as they are
+    Untimed calls get these, so bodies sorting or otherwise changing their inputs in place leave the timed call's alone
+    '''
+    def fresh(value):
+        if isinstance(value, np.ndarray):
+            return np.array(value)
+        elif isinstance(value, (list, dict, set, bytearray)):
+            return copy.copy(value)
+        return value
+
+    return tuple(fresh(arg) for arg in args), {key: fresh(val) for key, val in kwargs.items()}
+
+
+_harness_overhead = []
+
+
+def harness_overhead():
+    '''
+    Calibrate the cost of timing an empty call with _time_loops, once per process
+    :return: list of (fixed ns, per loop ns) tuples for the perf, process and thread clocks
+    '''
+    if not _harness_overhead:
+        single = [min(c) for c in zip(*(_time_loops(_noop, (), {}, 1)[1:] for _ in range(200)))]
+        looped = [min(c) for c in zip(*(_time_loops(_noop, (), {}, 1000)[1:] for _ in range(20)))]
+        for one, thousand in zip(single, looped):
+            per_loop = max(thousand - one, 0) / 999
+            _harness_overhead.append((max(one - per_loop, 0), per_loop))
+    return _harness_overhead
+
+
+class RSSSampler(threading.Thread):
+    ''' Background thread tracking the peak resident set size of this process '''
+
+    def __init__(self, interval=0.001):
+        super(RSSSampler, self).__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def stop(self):
+        ''' Stop sampling and return the peak rss seen in bytes '''
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return self.peak
+
+
+def _measure_memory(f, args, kwargs, interval):
+    ''' Call f once under tracemalloc and an RSSSampler, returning memory usage relative to before the call '''
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    rss0 = psutil.Process().memory_info().rss
+    sampler = RSSSampler(interval)
+    sampler.start()
+    tracemalloc.reset_peak()
+    current0, _ = tracemalloc.get_traced_memory()
+    try:
+        preturn = f(*args, **kwargs)  # keep the return value alive so it counts as allocated
+        current1, peak = tracemalloc.get_traced_memory()
+    finally:
+        rss_peak = sampler.stop()
+        if not was_tracing:
+            tracemalloc.stop()
+    rss1 = psutil.Process().memory_info().rss
+    del preturn
+    return {
+        'peak_bytes': peak - current0,
+        'alloc_bytes': current1 - current0,
+        'rss_delta': rss1 - rss0,
+        'rss_peak_delta': rss_peak - rss0
+    }
+
+
+def _profile_lines(f, args, kwargs, other_funcs):
+    '''
+    Call f once under a LineProfiler that also traces other_funcs
+    :return: list of (file, function, line, hits, total ns, per hit ns) tuples for every line that was hit
+    '''
+    from line_profiler import LineProfiler
+
+    lp = LineProfiler()
+    for func in [f] + list(other_funcs or []):
+        lp.add_function(getattr(func, '__func__', func))  # unwrap bound methods
+    lp.enable_by_count()
+    try:
+        f(*args, **kwargs)
+    finally:
+        lp.disable_by_count()
+
+    stats = lp.get_stats()
+    line_stats = []
+    for (filename, _, func_name), timings in stats.timings.items():
+        for lineno, hits, total in timings:
+            if hits:
+                total_ns = total * stats.unit * 1e9
+                line_stats.append((filename, func_name, lineno, hits, total_ns, total_ns / hits))
+    return line_stats
 
 
 class JungleProfiler(object):
     """ Decorator class for profiling a function or method """
 
-    def __init__(self, m_prof=True, t_prof=True, other_funcs=None, **kwargs):
+    # Measurements reported as columns of JungleExperiment.controller_df
+    columns = ('walltime', 'walltime_ns', 'process_time_ns', 'thread_time_ns', 'loops', 'overhead_ns',
+               'peak_bytes', 'alloc_bytes', 'rss_delta', 'rss_peak_delta', 'capture_ns', 'capture_chars', 'capture_writes')
+    # Columns of the line_stats table and of JungleExperiment.line_df
+    line_columns = ('file', 'function', 'line', 'hits', 'total_ns', 'per_hit_ns')
+
+    def __init__(self, m_prof=True, t_prof=True, other_funcs=None, autorange=False, min_time=0.01, max_loops=10 ** 6,
+                 rss_interval=0.001, capture='memory', capture_limit=65536, spool_dir=None, **kwargs):
+        '''
+        :param m_prof: measure memory in a separate, untimed call of the body with tracemalloc and rss sampling
+        :param t_prof: collect line timings of the body in a separate, untimed call under a LineProfiler
+        :param other_funcs: extra functions or bound methods called by the body to collect line timings of
+        :param autorange: repeat bodies faster than min_time in an inner loop and report the per call time. Every
+            loop gets the same argument objects, so only use it with bodies that don't change their inputs (an in
+            place sort would time already sorted inputs after the first call)
+        :param min_time: seconds an autoranged batch of calls should last at least
+        :param max_loops: upper bound on the number of calls in an autoranged batch
+        :param rss_interval: seconds between rss samples taken while measuring memory
+        :param capture: what happens to the body's stdout, see CaptureStream. 'memory' keeps it all, 'discard' drops
+            it, 'ring' keeps its last capture_limit characters, 'spool' writes it to a file whose path is kept,
+            'passthrough' lets it through. The time spent writing it is reported as capture_ns and taken out of
+            walltime, process and thread time. Writing stdout is taken to be all cpu time, timing it on the cpu clocks
+            too would cost two system calls per write
+        :param spool_dir: directory 'spool' files are kept in. With None they are temporary files removed when the
+            process that ran the body exits, so read them before then
+        '''
         print('%s.__init__ called' % self.__class__.__name__)
         self.other_funcs = other_funcs
         self.m_prof = m_prof
         self.t_prof = t_prof
+        self.autorange = autorange
+        self.min_time = min_time
+        self.max_loops = max_loops
+        self.rss_interval = rss_interval
+        self.capture = capture
+        self.capture_limit = capture_limit
+        self.spool_dir = spool_dir
+        check_policy(capture)  # fail on unknown policies now rather than at the first call
         self.kwargs = kwargs
         pass
 
@@ -377,38 +1008,129 @@ class JungleProfiler(object):
         def jungleprofiler_wrapped_f(*args, **kwargs):
             ''' Wrapper that collects time and system usage data on wrapped function f'''
 
-            # Set up LineProfiler
-            lp = LineProfiler()
-            lp.add_function(f)
-
-            # Set up MemoryProfiler
-            pass  # todo add Memory Profiler
-
-            # Start Counters
-            if self.t_prof: lp.enable_by_count()
-            if self.m_prof: pass
+            overhead = harness_overhead()
+            measurements = {}
+
+            # Memory is measured on its own call so tracemalloc doesn't slow down the timed calls. It and the line pass
+            # run before the timed call, each on a copy of the inputs made just before it and freed after it, so the
+            # timed call gets the untouched inputs without extra copies alive
+            if self.m_prof:
+                inputs = _copy_inputs(args, kwargs)
+                with redirect_stdout(CaptureStream('discard')):
+                    measurements.update(_measure_memory(f, *inputs, interval=self.rss_interval))
+                del inputs
+
+            # Line timings also get their own call, line tracing would swamp the timed calls
+            if self.t_prof:
+                inputs = _copy_inputs(args, kwargs)
+                with redirect_stdout(CaptureStream('discard')):
+                    measurements['line_stats'] = _profile_lines(f, *inputs, other_funcs=self.other_funcs)
+                del inputs
+
+            # Set up and torn down outside of the timed calls
+            capture = CaptureStream(self.capture, self.capture_limit, self.spool_dir)
             try:
-                t0 = time.time()
-                sio = io.StringIO()  # Collects redirected stdout
-                with redirect_stdout(sio):
-                    preturn = f(*args, **kwargs)
-                self.stdout = sio.getvalue()
-                t1 = time.time()
+                with redirect_stdout(capture):
+                    loops = 1
+                    preturn, wall_ns, process_ns, thread_ns = _time_loops(f, args, kwargs, loops)
+                    if self.autorange and wall_ns < self.min_time * 1e9:
+                        # Too fast to time reliably in one call, time a batch lasting about min_time instead
+                        loops = min(self.max_loops, int(self.min_time * 1e9 / max(wall_ns, 1)) + 1)
+                        capture.reset()
+                        preturn, wall_ns, process_ns, thread_ns = _time_loops(f, args, kwargs, loops)
+                measurements.update({'stdout': capture.getvalue(), 'loops': loops, 'capture_ns': capture.ns / loops,
+                                     'capture_chars': capture.chars / loops, 'capture_writes': capture.writes / loops})
             finally:
-                # Stop Counters
-                if self.m_prof: lp.disable_by_count()
-                if self.m_prof: pass  # todo add Memory Profiler
+                capture.close()
 
-            # Collect Stats
-            # print('Get Stats: %s' % lp.print_stats())
+            # Subtract the calibrated harness overhead and the time spent writing stdout, and report per call times
+            for name, raw_ns, (fixed_ns, per_loop_ns) in zip(('walltime_ns', 'process_time_ns', 'thread_time_ns'),
+                                                             (wall_ns, process_ns, thread_ns), overhead):
+                measurements[name] = max(raw_ns - fixed_ns - per_loop_ns * loops - capture.ns, 0) / loops
+            measurements['walltime'] = measurements['walltime_ns'] / 1e9
+            measurements['overhead_ns'] = overhead[0][0] / loops + overhead[0][1]
 
-            self.walltime = t1 - t0
-            return preturn, copy.deepcopy(self)
+            profile = ProfileResult(**measurements)
+            register_profile(profile)
+            return preturn, profile
 
         return jungleprofiler_wrapped_f
 
+
+def _restore_result(cls, state):
+    ''' Rebuild an immutable result from its state, used to pickle and copy them '''
+    return cls(**state)
+
+
+class ProfileResult(object):
+    ''' Immutable measurements of a single call to a JungleProfiler decorated function '''
+
+    __slots__ = JungleProfiler.columns + ('line_stats', 'stdout')
+
+    def __init__(self, **measurements):
+        for name in self.__slots__:
+            object.__setattr__(self, name, measurements.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        return _restore_result, (self.__class__, {name: getattr(self, name) for name in self.__slots__})
+
+    def __str__(self):
+        s = 'Walltime: %s\tProcess Time: %sns\tThread Time: %sns\tLoops: %d' % (
+            self.walltime, self.process_time_ns, self.thread_time_ns, self.loops)
+        if self.peak_bytes is not None:
+            s += '\tPeak: %dB\tAllocated: %dB\tRSS Delta: %dB' % (self.peak_bytes, self.alloc_bytes, self.rss_delta)
+        return s
+
+
+class ExperimentResult(object):
+    '''
+    Immutable runs of a single call to a JungleExperiment decorated function
+    Per call metadata (JungleExperiment.call_attributes, e.g. vm and environment) is copied into the result, metadata
+    shared by every call such as platform_specs, python_version and source_code is read from the experiment
+    '''
+
+    __slots__ = ('experiment', 'runs', 'line_rows') + JungleExperiment.call_attributes
+
+    def __init__(self, experiment, runs, line_rows, **snapshot):
+        object.__setattr__(self, 'experiment', experiment)
+        object.__setattr__(self, 'runs', runs)
+        object.__setattr__(self, 'line_rows', line_rows)
+        for attr in JungleExperiment.call_attributes:
+            object.__setattr__(self, attr, snapshot.get(attr))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __getattr__(self, name):
+        if name in self.__slots__:  # not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.experiment, name)
+
+    def __reduce__(self):
+        return _restore_result, (self.__class__, {name: getattr(self, name) for name in self.__slots__})
+
+    @property
+    def controller_df(self):
+        return runs_frame(self.runs)
+
+    @property
+    def line_df(self):
+        return line_frame(self.line_rows)
+
+    def analyze_rundict(self, **kwargs):
+        ''' JungleExperiment.analyze_rundict of this result's runs '''
+        return self.experiment.analyze_rundict(runs=self.runs, **kwargs)
+
+    def dump_(self, path):
+        ''' Write this result to a binary file that JungleExperiment.load memory-maps '''
+        snapshot = {attr: getattr(self, attr) for attr in JungleExperiment.call_attributes}
+        self.experiment.dump_(path, self.runs, self.line_rows, snapshot)
+
     def __str__(self):
-        return 'Walltime: %s' % self.walltime
+        return self.experiment.describe(self.runs)
 
 
 # JungleExperiment = partial(DelayedDecorator, JungleExperiment)
@@ -466,11 +1188,11 @@ if __name__ == '__main__':
         print('\n------- %s -------' % f.__name__)
         print('Docs: %s' % f.__doc__)
         jp = f()
-        for d in jp.run_dict:
-            print('Run #%d -> %s' % (d, jp.run_dict[d]))
-            print('Error: %s' % jp.run_dict[d]['error'])
-            print('Profile: %s' % jp.run_dict[d]['profile'])
-            print('StdOut: \n%s' % jp.run_dict[d]['stdout'])
+        for d in range(len(jp.runs)):
+            run = jp.runs.row(d)
+            print('Run #%d -> %s' % (d, run))
+            print('Walltime: %s' % run.get('walltime'))
+            print('StdOut: \n%s' % run.get('stdout'))
 
 
     # test_func(simple_func)
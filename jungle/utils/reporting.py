@@ -0,0 +1,104 @@
+'''
+Headless report rendering for TestTreeAutomation
+Figures are drawn with the Agg backend straight to files, in worker processes, and only when their data changed. The
+backend is only selected in those workers, importing this module leaves the caller's backend alone
+'''
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+
+def frame_hash(frame):
+    ''' Content hash of a DataFrame, used to skip figures whose data hasn't changed '''
+    hashes = pd.util.hash_pandas_object(frame.astype(str), index=False).values
+    return hashlib.sha256(hashes.tobytes() + ','.join(frame.columns).encode()).hexdigest()
+
+
+def _use_agg():
+    ''' Initializer of the render workers '''
+    matplotlib.use('Agg')
+
+
+def render_test_figures(frame, out_prefix):
+    '''
+    Draw the figures comparing the implementations ('Method') of one test and save them as PNGs
+    :param out_prefix: path prefix of the figure files, the figure name and extension are appended
+    :return: list of the files written
+    '''
+    sns.set_style('darkgrid')
+    metric = 'walltime' if 'walltime' in frame and frame['walltime'].notna().any() else 'controller walltime'
+    kwarg_cols = [col for col in frame.columns if col.startswith('kwarg: ')]
+    n_colors = len(np.unique(frame['Method']))
+    pal = sns.diverging_palette(255, 133, l=60, center="dark", n=n_colors)
+    paths = []
+
+    def save(g, name):
+        path = '%s_%s.png' % (out_prefix, name)
+        g.savefig(path)
+        plt.close(g.figure)
+        paths.append(path)
+
+    if kwarg_cols:
+        # One small panel per rep, capped so adaptive schedules with many reps stay readable
+        reps = frame[frame['rep'] < 20] if 'rep' in frame else frame
+        g = sns.FacetGrid(data=reps, col='rep', hue='Method', col_wrap=5, height=1.5)
+        g = g.map(plt.plot, kwarg_cols[0], metric, marker='.')
+        save(g, 'reps')
+
+    for col in kwarg_cols:
+        g = sns.catplot(data=frame, x=col, y=metric, hue='Method', kind='point', palette=pal,
+                        height=6, aspect=2, alpha=0.5, capsize=.2)
+        g.despine(offset=10, trim=True)
+        save(g, col.replace('kwarg: ', 'by_'))
+
+    g = sns.catplot(data=frame, x='index', y=metric, hue='Method', kind='point')
+    save(g, 'run_order')
+
+    g = sns.relplot(data=frame, x='start_seconds', y='controller walltime', hue='Method')
+    save(g, 'start_time')
+    return paths
+
+
+def render_reports(jobs, report_dir, workers=None):
+    '''
+    Render the figures of every (name, frame) job into report_dir, skipping jobs whose frame hash is unchanged
+    since the last render
+    :param workers: number of processes to render in, None for one per cpu
+    :return: dict of job name -> list of figure files
+    '''
+    manifest_path = os.path.join(report_dir, 'manifest.json')
+    try:
+        with open(manifest_path, mode='r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    rendered = {}
+    futures = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool:
+        for name, frame in jobs:
+            digest = frame_hash(frame)
+            entry = manifest.get(name)
+            if entry and entry['hash'] == digest and all(os.path.exists(path) for path in entry['files']):
+                print('Report %s has NOT changed, skipping' % name)
+                rendered[name] = entry['files']
+                continue
+            out_prefix = os.path.join(report_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(out_prefix), exist_ok=True)
+            futures[name] = (digest, pool.submit(render_test_figures, frame, out_prefix))
+
+        for name, (digest, future) in futures.items():
+            rendered[name] = future.result()
+            manifest[name] = {'hash': digest, 'files': rendered[name]}
+            print('Rendered report %s' % name)
+
+    os.makedirs(report_dir, exist_ok=True)
+    with open(manifest_path, mode='w') as f:
+        json.dump(manifest, f, sort_keys=True, indent=3)
+    return rendered
@@ -0,0 +1,199 @@
+'''
+Columnar storage for the runs of a JungleExperiment
+
+Stores are dumped to a single binary file laid out as
+    MAGIC | header length (uint64 little endian) | JSON header | padding | column blocks, each 64 byte aligned
+where the header holds the metadata, the row count and the dtype and block offset of every column. Numeric columns
+and validity masks are raw little endian arrays so they can be memory-mapped on load, object columns are JSON lists
+'''
+import json
+import os
+import numpy as np
+
+MAGIC = b'JUNGLE\x00\x01'
+ALIGN = 64
+
+
+class RunStore(object):
+    ''' Preallocated, typed numpy columns that JungleExperiment runs are written into row by row '''
+
+    def __init__(self, size):
+        '''
+        :param size: expected number of runs, usually the length of the test sequence. The store grows past it if needed
+        '''
+        self.capacity = max(size, 1)
+        self.n_rows = 0
+        self.columns = {}  # column name -> values array
+        self.valid = {}  # column name -> bool array, False where a row never wrote the column
+
+    def __len__(self):
+        return self.n_rows
+
+    @classmethod
+    def from_columns(cls, columns, valid, n_rows):
+        ''' Store wrapping existing column and validity arrays of n_rows rows, e.g. memory-mapped ones '''
+        store = cls(n_rows)
+        store.columns = columns
+        store.valid = valid
+        store.n_rows = n_rows
+        return store
+
+    def dump(self, path, metadata):
+        '''
+        Write the written rows of every column and the JSON-able metadata dict to path
+        The file is written under a temporary name and renamed over path, so stores loaded from path keep mapping the
+        old file unchanged
+        '''
+        blocks = []
+        header = {'metadata': metadata, 'n_rows': self.n_rows, 'columns': []}
+        offset = 0
+        for name, values in self.columns.items():
+            values = values[:self.n_rows]
+            if values.dtype == object:
+                data = json.dumps(values.tolist(), default=_encode).encode()
+                dtype = 'json'
+            else:
+                data = values.astype(values.dtype.newbyteorder('<')).tobytes()
+                dtype = values.dtype.newbyteorder('<').str
+            mask = self.valid[name][:self.n_rows].tobytes()
+            column = {'name': name, 'dtype': dtype}
+            for key, block in (('offset', data), ('valid_offset', mask)):
+                column[key], column[key.replace('offset', 'length')] = offset, len(block)
+                blocks.append(block + b'\x00' * (-len(block) % ALIGN))
+                offset += len(blocks[-1])
+            header['columns'].append(column)
+
+        header = json.dumps(header, default=_encode).encode()
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, mode='wb') as out_file:
+            out_file.write(MAGIC + np.uint64(len(header)).astype('<u8').tobytes() + header)
+            out_file.write(b'\x00' * (-out_file.tell() % ALIGN))
+            for block in blocks:
+                out_file.write(block)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Read a store written by dump, memory-mapping its numeric columns read only
+        :return: (store, metadata)
+        '''
+        with open(path, mode='rb') as in_file:
+            if in_file.read(len(MAGIC)) != MAGIC:
+                raise ValueError('%s is not a dumped JungleExperiment' % path)
+            header_length = int(np.frombuffer(in_file.read(8), dtype='<u8')[0])
+            header = json.loads(in_file.read(header_length).decode())
+            data_start = len(MAGIC) + 8 + header_length
+            data_start += -data_start % ALIGN
+
+            n_rows = header['n_rows']
+            columns, valid = {}, {}
+            for column in header['columns']:
+                name = column['name']
+                if column['dtype'] == 'json':
+                    in_file.seek(data_start + column['offset'])
+                    columns[name] = np.empty(n_rows, dtype=object)
+                    columns[name][:] = json.loads(in_file.read(column['length']).decode())
+                else:
+                    columns[name] = _memmap(path, column['dtype'], data_start + column['offset'], n_rows)
+                valid[name] = _memmap(path, np.bool_, data_start + column['valid_offset'], n_rows)
+        return cls.from_columns(columns, valid, n_rows), header['metadata']
+
+    def write(self, i, row):
+        ''' Write the dict row into row i, creating columns for keys not seen before. None values are left missing '''
+        if i >= self.capacity:
+            self._grow(i + 1)
+        for name, val in row.items():
+            if val is None:
+                continue
+            if name not in self.columns:
+                self._add_column(name, val)
+            values = self.columns[name]
+            if not _fits(values.dtype, val):
+                values = self._promote(name, val)
+            values[i] = val
+            self.valid[name][i] = True
+        self.n_rows = max(self.n_rows, i + 1)
+
+    def row(self, i):
+        ''' Read row i back as a dict, leaving out columns it never wrote '''
+        return {name: values[i] for name, values in self.columns.items() if self.valid[name][i]}
+
+    def to_frame(self):
+        ''' DataFrame viewing the written rows of every column without copying them '''
+        import pandas as pd
+
+        data = {}
+        for name, values in self.columns.items():
+            values = values[:self.n_rows]
+            missing = ~self.valid[name][:self.n_rows]
+            if missing.any() and values.dtype == np.int64:
+                values = pd.arrays.IntegerArray(values, missing)
+            elif missing.any() and values.dtype == np.bool_:
+                values = pd.arrays.BooleanArray(values, missing)
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+    def _add_column(self, name, val):
+        dtype = _dtype_of(val)
+        if dtype == np.float64:
+            values = np.full(self.capacity, np.nan)
+        else:
+            values = np.zeros(self.capacity, dtype=dtype) if dtype != object else np.full(self.capacity, None)
+        self.columns[name] = values
+        self.valid[name] = np.zeros(self.capacity, dtype=bool)
+
+    def _promote(self, name, val):
+        ''' Widen a column to float64 (ints meeting floats) or object so it can hold val '''
+        values = self.columns[name]
+        if values.dtype == np.int64 and _dtype_of(val) == np.float64:
+            promoted = values.astype(np.float64)
+            promoted[~self.valid[name]] = np.nan
+        else:
+            promoted = values.astype(object)
+            promoted[~self.valid[name]] = None
+        self.columns[name] = promoted
+        return promoted
+
+    def _grow(self, min_capacity):
+        capacity = max(min_capacity, 2 * self.capacity)
+        for name, values in self.columns.items():
+            fill = np.nan if values.dtype == np.float64 else (None if values.dtype == object else 0)
+            grown = np.full(capacity, fill, dtype=values.dtype)
+            grown[:self.capacity] = values
+            self.columns[name] = grown
+            valid = np.zeros(capacity, dtype=bool)
+            valid[:self.capacity] = self.valid[name]
+            self.valid[name] = valid
+        self.capacity = capacity
+
+
+def _encode(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return repr(obj)
+
+
+def _memmap(path, dtype, offset, n_rows):
+    if n_rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(n_rows,))
+
+
+_INT64_MIN, _INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+
+def _dtype_of(val):
+    if isinstance(val, (bool, np.bool_)):
+        return np.bool_
+    elif isinstance(val, (int, np.integer)):
+        return np.int64 if _INT64_MIN <= val <= _INT64_MAX else object  # ints beyond int64 go in object columns
+    elif isinstance(val, (float, np.floating)):
+        return np.float64
+    return object
+
+
+def _fits(dtype, val):
+    if dtype == object:
+        return True
+    return dtype == _dtype_of(val) or (dtype == np.float64 and _dtype_of(val) == np.int64)
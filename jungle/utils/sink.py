@@ -0,0 +1,77 @@
+'''
+Append-only JSON Lines store of JungleExperiment runs, partitioned by module/prototype/test
+Every run is appended as one line as soon as it is recorded, so a crash mid-sweep loses at most the line being written
+Lines are written with a single os.write on an O_APPEND descriptor, so processes appending to the same partition
+(e.g. TestTreeAutomation workers running implementations of one test) never interleave their lines
+'''
+import glob
+import json
+import os
+import numpy as np
+
+
+def _encode(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return repr(obj)
+
+
+class RunSink(object):
+    ''' Directory of <module>/<prototype>/<test>.jsonl partitions that runs are appended to '''
+
+    def __init__(self, root='results'):
+        self.root = root
+        self._files = {}  # open O_APPEND file descriptors by partition path
+
+    def path(self, partition):
+        ''' File of a (module, prototype, test) partition '''
+        module, prototype, test = partition
+        return os.path.join(self.root, module, prototype, '%s.jsonl' % test)
+
+    def append(self, partition, row):
+        ''' Append row as one line of partition, written straight to the file '''
+        path = self.path(partition)
+        line = (json.dumps(row, default=_encode) + '\n').encode()
+        fd = self._files.get(path)
+        if fd is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)  # no newline translation on Windows
+            fd = self._files[path] = os.open(path, flags, 0o644)
+        # End a line a crashed process left half written, so it doesn't swallow this one. Racing another append only
+        # adds an empty line, which read skips. O_APPEND writes ignore the position this seeks to
+        if os.lseek(fd, 0, os.SEEK_END) > 0:
+            os.lseek(fd, -1, os.SEEK_END)
+            if os.read(fd, 1) != b'\n':
+                line = b'\n' + line
+        written = os.write(fd, line)
+        while written < len(line):  # only short on a full disk or a signal
+            written += os.write(fd, line[written:])
+
+    def close(self):
+        for fd in self._files.values():
+            os.close(fd)
+        self._files = {}
+
+    def partitions(self, module='*', prototype='*', test='*'):
+        ''' (module, prototype, test) partitions on disk matching the glob patterns given '''
+        for path in sorted(glob.glob(os.path.join(self.root, module, prototype, '%s.jsonl' % test))):
+            path, test_name = os.path.split(path)
+            path, prototype_name = os.path.split(path)
+            yield os.path.basename(path), prototype_name, os.path.splitext(test_name)[0]
+
+    def read(self, module='*', prototype='*', test='*'):
+        ''' Lazily yield the rows of the matching partitions, skipping a line left half written by a crash '''
+        for partition in self.partitions(module, prototype, test):
+            with open(self.path(partition), mode='r') as in_file:
+                for line in in_file:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    row['module'], row['prototype'], row['test'] = partition
+                    yield row
+
+    def load(self, module='*', prototype='*', test='*'):
+        ''' DataFrame of the rows of the matching partitions '''
+        import pandas as pd
+        return pd.DataFrame(list(self.read(module, prototype, test)))
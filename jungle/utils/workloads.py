@@ -0,0 +1,82 @@
+'''
+Vectorized generators of sorting workloads
+Inputs are built in O(n) numpy operations, without sorting anything, so even 10^8 element inputs take seconds. Every
+generator is deterministic for a given seed
+'''
+import numpy as np
+
+
+def sorted_values(n, distinct=None, dtype='float64', rng=None):
+    '''
+    Ascending array of n values built from cumulative sums of random gaps
+    :param distinct: number of distinct values, None for all distinct. Every value is then repeated n / distinct
+        times (rounded either way)
+    :param dtype: numpy dtype of the values. float32 only keeps values distinct up to about 2^24 elements
+    '''
+    rng = np.random.default_rng(rng)
+    dtype = np.dtype(dtype)
+    levels = n if distinct is None else max(1, min(distinct, n))
+    gaps = rng.integers(1, 4, levels) if dtype.kind in 'iu' else rng.random(levels) + 0.5
+    values = np.cumsum(gaps)
+    if levels < n:
+        values = values[np.arange(n) * levels // n]
+    return values.astype(dtype, copy=False)
+
+
+def shuffle_blocks(a, n_blocks, rng=None):
+    '''
+    Copy of a sorted array dealt into n_blocks sorted blocks of (nearly) equal size, put in a random order
+    Block j takes every n_blocks-th value starting from the j-th, so every block spans about the whole range of a and
+    ends above where the next one starts. The result has exactly n_blocks ascending runs whatever the order, as long
+    as the blocks hold at least two distinct values
+    '''
+    rng = np.random.default_rng(rng)
+    order = rng.permutation(n_blocks)
+    if len(a) % n_blocks == 0:
+        return a.reshape(-1, n_blocks).T[order].ravel()
+    return np.concatenate([a[block::n_blocks] for block in order])
+
+
+def disorder(a, presortedness, rng=None):
+    '''
+    Shuffle the elements of a among their own positions, in place, picking each one with probability
+    1 - presortedness. presortedness 1 leaves a untouched and 0 shuffles it completely
+    '''
+    rng = np.random.default_rng(rng)
+    if presortedness <= 0:
+        rng.shuffle(a)
+    elif presortedness < 1:
+        # A Bernoulli mask streams through memory, unlike drawing exact positions without replacement
+        positions = np.flatnonzero(rng.random(len(a)) >= presortedness)
+        picked = a[positions]
+        rng.shuffle(picked)
+        a[positions] = picked
+    return a
+
+
+def workload(n, presortedness=0., duplicate_ratio=0., n_blocks=1, descending=False, dtype='float64', seed=0):
+    '''
+    Sorting input of n values
+    :param presortedness: expected fraction of the elements left at their sorted position, the others are shuffled
+        among themselves. 0 is a random permutation, 1 sorted (within blocks)
+    :param duplicate_ratio: fraction of the elements that repeat a value already in the input
+    :param n_blocks: number of sorted blocks of (nearly) equal size the input is made of, see shuffle_blocks
+    :param descending: reverse the input, so presorted inputs are in descending order
+    :param seed: seed of numpy's default_rng
+    :return: numpy array
+    '''
+    rng = np.random.default_rng(seed)
+    distinct = None if duplicate_ratio <= 0 else int(round(n * (1 - duplicate_ratio)))
+    a = sorted_values(n, distinct, dtype, rng)
+    if n_blocks > 1:
+        a = shuffle_blocks(a, n_blocks, rng)
+    disorder(a, presortedness, rng)
+    if descending:
+        a = a[::-1].copy()
+    return a
+
+
+def count_runs(a):
+    ''' Number of maximal ascending runs of a, 1 for sorted inputs and about len(a) / 2 for random ones '''
+    a = np.asarray(a)
+    return int(np.count_nonzero(a[1:] < a[:-1])) + 1 if len(a) else 0